@@ -0,0 +1,177 @@
+# bulk_wallets.py
+import argparse
+import base64
+import getpass
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from Crypto.Cipher import AES
+from Crypto.Protocol.KDF import scrypt
+from Crypto.Random import get_random_bytes
+
+from keypair_pool import generate_entry
+from signature_schemes import DEFAULT_SCHEME, SCHEMES
+
+KEYSTORE_MAGIC = b'QRCKS2'
+LEGACY_KEYSTORE_MAGIC = b'QRCKS1'  # Full keypairs instead of seeds
+BATCH_CHUNK = 256  # Wallets generated per worker task
+
+
+def _generate_chunk(count, algorithm):
+    return [generate_entry(algorithm) for _ in range(count)]
+
+
+def _noop(_):
+    return None
+
+
+class WalletGenerator:
+    """Generates wallets across a pool of worker processes"""
+
+    def __init__(self, workers=None, chunk=BATCH_CHUNK, algorithm=DEFAULT_SCHEME):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self.algorithm = algorithm
+        # Workers start once, up front, and are reused for every batch. The
+        # platform's default start method is used, as for the keypair pool.
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context())
+
+    def start(self):
+        """Start the workers now rather than on the first batch"""
+        list(self.executor.map(_noop, range(self.workers)))
+
+    def generate(self, count):
+        """Yield (address, seed) for count new wallets
+
+        Only a few chunks per worker are in flight at once, so a slow
+        consumer does not make finished keys pile up in memory.
+        """
+        sizes = iter([min(self.chunk, count - start) for start in range(0, count, self.chunk)])
+        pending = deque(
+            self.executor.submit(_generate_chunk, size, self.algorithm)
+            for size in islice(sizes, 2 * self.workers)
+        )
+        while pending:
+            entries = pending.popleft().result()
+            for size in islice(sizes, 1):
+                pending.append(self.executor.submit(_generate_chunk, size, self.algorithm))
+            yield from entries
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _derive_key(passphrase, salt):
+    return scrypt(passphrase.encode(), salt, 32, N=2 ** 15, r=8, p=1)
+
+
+class KeystoreWriter:
+    """Writes an AES-256-GCM encrypted keystore front to back
+
+    Layout: magic, 16-byte scrypt salt, 12-byte nonce, ciphertext of
+    newline-delimited JSON entries, 16-byte GCM tag. Each entry holds an
+    address and its 32-byte key seed; the keypair is re-derived from the
+    seed when needed. Wallets of a scheme other than the default also
+    record its algorithm. Entries are encrypted as they are added and
+    appended, so the file is produced in one sequential pass without
+    holding the batch in memory.
+    """
+
+    def __init__(self, path, passphrase, algorithm=DEFAULT_SCHEME):
+        self.path = path
+        self.algorithm = algorithm
+        self.tmp_path = path + '.tmp'
+        salt = get_random_bytes(16)
+        nonce = get_random_bytes(12)
+        self.cipher = AES.new(_derive_key(passphrase, salt), AES.MODE_GCM, nonce=nonce)
+        self.file = open(self.tmp_path, 'wb', buffering=1024 * 1024)
+        self.file.write(KEYSTORE_MAGIC + salt + nonce)
+        self.count = 0
+
+    def add(self, address, seed):
+        entry = {'address': address, 'seed': base64.b64encode(seed).decode()}
+        if self.algorithm != DEFAULT_SCHEME:
+            entry['algorithm'] = self.algorithm
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        self.file.write(self.cipher.encrypt(line.encode()))
+        self.count += 1
+
+    def close(self):
+        self.file.write(self.cipher.digest())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_keystore(path, passphrase):
+    """Decrypt a keystore and return its entries, raising ValueError if tampered"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = len(KEYSTORE_MAGIC)
+    if data[:header] not in (KEYSTORE_MAGIC, LEGACY_KEYSTORE_MAGIC):
+        raise ValueError("Not a QRC keystore")
+
+    salt, nonce = data[header:header + 16], data[header + 16:header + 28]
+    ciphertext, tag = data[header + 28:-16], data[-16:]
+    cipher = AES.new(_derive_key(passphrase, salt), AES.MODE_GCM, nonce=nonce)
+    plaintext = cipher.decrypt_and_verify(ciphertext, tag)
+
+    return [json.loads(line) for line in plaintext.splitlines()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate QRC wallets in bulk")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="Create wallets and an encrypted keystore")
+    generate.add_argument('count', type=int)
+    generate.add_argument('--keystore', required=True, help="Encrypted keystore file to write")
+    generate.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    generate.add_argument('--out', default='-', help="NDJSON of addresses (default: stdout)")
+    generate.add_argument('--algorithm', default=DEFAULT_SCHEME, choices=sorted(SCHEMES),
+                          help="Signature scheme (default: %(default)s)")
+
+    show = commands.add_parser('list', help="Print the addresses in a keystore")
+    show.add_argument('keystore')
+
+    args = parser.parse_args()
+    passphrase = os.environ.get('KEYSTORE_PASSPHRASE') or getpass.getpass("Keystore passphrase: ")
+
+    if args.command == 'list':
+        for entry in read_keystore(args.keystore, passphrase):
+            print(entry['address'])
+        return
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    generator = WalletGenerator(args.workers, algorithm=args.algorithm)
+    try:
+        with KeystoreWriter(args.keystore, passphrase, args.algorithm) as keystore:
+            for address, seed in generator.generate(args.count):
+                keystore.add(address, seed)
+                out.write(json.dumps({'address': address}) + '\n')
+    finally:
+        generator.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    print(f"Wrote {keystore.count} wallets to {args.keystore}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
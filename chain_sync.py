@@ -0,0 +1,73 @@
+# chain_sync.py - Export and import the chain as newline-delimited JSON
+#
+# Usage:
+#   python chain_sync.py export chain.ndjson
+#   python chain_sync.py export - --from 1000 > tail.ndjson
+#   python chain_sync.py import chain.ndjson --admin-key $ADMIN_KEY
+import argparse
+import os
+import sys
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+def export_chain(base_url, output, start=0):
+    """Stream the chain from a node into a file without buffering it"""
+    response = requests.get(f"{base_url}/api/chain/export", params={'from': start}, stream=True)
+    response.raise_for_status()
+
+    out = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    written = 0
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    return written
+
+def import_chain(base_url, source, admin_key):
+    """Stream an exported chain file to a node for validation and import"""
+    def read_chunks():
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                yield chunk
+
+    response = requests.post(
+        f"{base_url}/api/chain/import",
+        data=read_chunks(),
+        headers={'Content-Type': 'application/x-ndjson', 'X-Admin-Key': admin_key}
+    )
+    return response.json()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import the QRC chain as NDJSON")
+    parser.add_argument('--url', default=os.environ.get('QRC_NODE_URL', 'http://localhost:5000'),
+                        help="Node base URL (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="Write blocks to a file ('-' for stdout)")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--from', dest='start', type=int, default=0, help="First block height")
+
+    import_parser = commands.add_parser('import', help="Send blocks from a file to the node")
+    import_parser.add_argument('source')
+    import_parser.add_argument('--admin-key', default=os.environ.get('ADMIN_KEY', ''))
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        written = export_chain(args.url, args.output, args.start)
+        print(f"Exported {written} bytes", file=sys.stderr)
+    else:
+        result = import_chain(args.url, args.source, args.admin_key)
+        if result.get('success'):
+            print(f"Imported {result['imported']} blocks, skipped {result['skipped']} (height {result['height']})")
+        else:
+            print(f"Import failed at line {result.get('line')}: {result.get('error')}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
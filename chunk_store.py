@@ -0,0 +1,317 @@
+# chunk_store.py
+import hashlib
+import mmap
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+CHUNK_SIZE = 1024 * 1024   # Bytes per chunk (the last chunk of a file may be shorter)
+READ_BLOCK = 64 * 1024     # Bytes read from a request stream at a time
+
+
+class UploadSession:
+    """A partial upload spooled to disk, hashed as bytes arrive"""
+
+    __slots__ = ('id', 'path', 'received', 'expected_size', 'file_hasher',
+                 'chunk_hasher', 'chunk_fill', 'chunk_hashes', 'meta', 'updated', 'lock')
+
+    def __init__(self, upload_id, path, expected_size, meta):
+        self.id = upload_id
+        self.path = path
+        self.received = 0
+        self.expected_size = expected_size
+        self.file_hasher = hashlib.sha3_256()
+        self.chunk_hasher = hashlib.sha3_256()
+        self.chunk_fill = 0
+        self.chunk_hashes = []
+        self.meta = meta
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+
+class ChunkStore:
+    """Content-addressed file storage with deduplication
+
+    Files are split into fixed-size chunks named by their SHA3-256 hash,
+    so identical content is kept on disk once however many owners upload
+    it. Chunks and files are reference counted in a small SQLite index and
+    a chunk is deleted when the last file using it is released.
+    """
+
+    def __init__(self, root, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.upload_dir = os.path.join(root, 'uploads')
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.readers = {}           # file hash -> downloads in progress
+        self.pending_releases = {}  # file hash -> releases deferred until its readers finish
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.db = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, chunks TEXT NOT NULL, "
+                "refs INTEGER NOT NULL)"
+            )
+
+    def chunk_path(self, chunk_hash):
+        return os.path.join(self.chunk_dir, chunk_hash[:2], chunk_hash)
+
+    # Uploads
+
+    def begin_upload(self, expected_size=None, meta=None):
+        upload_id = secrets.token_hex(16)
+        path = os.path.join(self.upload_dir, upload_id)
+        open(path, 'wb').close()
+        session = UploadSession(upload_id, path, expected_size, meta or {})
+        with self.lock:
+            self.uploads[upload_id] = session
+        return session
+
+    def get_upload(self, upload_id):
+        return self.uploads.get(upload_id)
+
+    def write(self, upload_id, stream, offset):
+        """Append bytes from a file-like stream at offset
+
+        offset must equal the bytes already received, so a client that
+        lost its connection asks for the session and resumes from there.
+        Returns the new received size.
+        """
+        session = self.uploads.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+
+        with session.lock:
+            if offset != session.received:
+                raise ValueError(f"Expected offset {session.received}")
+
+            with open(session.path, 'ab') as spool:
+                while True:
+                    block = stream.read(READ_BLOCK)
+                    if not block:
+                        break
+                    if session.expected_size is not None and \
+                            session.received + len(block) > session.expected_size:
+                        raise ValueError("Upload is larger than the declared size")
+                    spool.write(block)
+                    self._hash_block(session, block)
+
+            session.updated = time.time()
+            return session.received
+
+    def _hash_block(self, session, block):
+        session.file_hasher.update(block)
+        session.received += len(block)
+        view = memoryview(block)
+        while view:
+            take = min(len(view), self.chunk_size - session.chunk_fill)
+            session.chunk_hasher.update(view[:take])
+            session.chunk_fill += take
+            view = view[take:]
+            if session.chunk_fill == self.chunk_size:
+                session.chunk_hashes.append(session.chunk_hasher.hexdigest())
+                session.chunk_hasher = hashlib.sha3_256()
+                session.chunk_fill = 0
+
+    def finish_upload(self, upload_id):
+        """Move a completed upload into the store
+
+        Returns (file_hash, size). The file gains one reference, which
+        the caller gives back with release() if it does not keep it.
+        """
+        session = self.uploads.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+
+        with session.lock:
+            # An incomplete upload stays open so the client can resume it
+            if session.expected_size is not None and session.received != session.expected_size:
+                raise ValueError(f"Upload incomplete: {session.received} of {session.expected_size} bytes")
+            with self.lock:
+                if self.uploads.get(upload_id) is not session:
+                    raise KeyError(upload_id)  # Finished or aborted meanwhile
+                del self.uploads[upload_id]
+
+            try:
+                chunk_hashes = list(session.chunk_hashes)
+                if session.chunk_fill:
+                    chunk_hashes.append(session.chunk_hasher.hexdigest())
+                file_hash = session.file_hasher.hexdigest()
+
+                with self.lock, self.db:
+                    row = self.db.execute("SELECT refs FROM files WHERE hash = ?", (file_hash,)).fetchone()
+                    if row:
+                        self.db.execute("UPDATE files SET refs = refs + 1 WHERE hash = ?", (file_hash,))
+                        return file_hash, session.received
+
+                    with open(session.path, 'rb') as spool:
+                        for index, chunk_hash in enumerate(chunk_hashes):
+                            self._store_chunk(spool, index, chunk_hash)
+                    self.db.execute(
+                        "INSERT INTO files (hash, size, chunks, refs) VALUES (?, ?, ?, 1)",
+                        (file_hash, session.received, ','.join(chunk_hashes))
+                    )
+                    return file_hash, session.received
+            finally:
+                os.remove(session.path)
+
+    def _store_chunk(self, spool, index, chunk_hash):
+        row = self.db.execute("SELECT refs FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone()
+        if row:
+            self.db.execute("UPDATE chunks SET refs = refs + 1 WHERE hash = ?", (chunk_hash,))
+            return
+
+        spool.seek(index * self.chunk_size)
+        data = spool.read(self.chunk_size)
+        path = self.chunk_path(chunk_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        self.db.execute("INSERT INTO chunks (hash, size, refs) VALUES (?, ?, 1)", (chunk_hash, len(data)))
+
+    def abort_upload(self, upload_id):
+        with self.lock:
+            session = self.uploads.pop(upload_id, None)
+        if session is not None:
+            with session.lock:
+                os.remove(session.path)
+
+    def purge_uploads(self, max_age=24 * 3600):
+        """Drop sessions that have not received data for max_age seconds"""
+        cutoff = time.time() - max_age
+        with self.lock:
+            stale = [s.id for s in self.uploads.values() if s.updated < cutoff]
+        for upload_id in stale:
+            self.abort_upload(upload_id)
+        return len(stale)
+
+    def start_sweeper(self, interval=60, max_age=24 * 3600):
+        """Purge abandoned uploads from a background thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.purge_uploads(max_age)
+                except OSError as e:
+                    print(f"Upload purge failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    # Stored files
+
+    def add_ref(self, file_hash):
+        with self.lock, self.db:
+            updated = self.db.execute("UPDATE files SET refs = refs + 1 WHERE hash = ?", (file_hash,))
+            if not updated.rowcount:
+                raise KeyError(file_hash)
+
+    def release(self, file_hash):
+        """Drop one reference, deleting chunks nothing else uses
+
+        Dropping the last reference while the file is being read is
+        deferred until the last reader finishes.
+        """
+        with self.lock, self.db:
+            row = self.db.execute("SELECT refs, chunks FROM files WHERE hash = ?", (file_hash,)).fetchone()
+            if row is None:
+                raise KeyError(file_hash)
+            refs, chunks = row
+            if refs > 1:
+                self.db.execute("UPDATE files SET refs = refs - 1 WHERE hash = ?", (file_hash,))
+                return
+            if self.readers.get(file_hash):
+                self.pending_releases[file_hash] = self.pending_releases.get(file_hash, 0) + 1
+                return
+
+            self.db.execute("DELETE FROM files WHERE hash = ?", (file_hash,))
+            for chunk_hash in filter(None, chunks.split(',')):
+                self.db.execute("UPDATE chunks SET refs = refs - 1 WHERE hash = ?", (chunk_hash,))
+                left = self.db.execute("SELECT refs FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone()
+                if left and left[0] <= 0:
+                    self.db.execute("DELETE FROM chunks WHERE hash = ?", (chunk_hash,))
+                    os.remove(self.chunk_path(chunk_hash))
+
+    def file_info(self, file_hash):
+        """(size, chunk hashes) for a stored file, or None"""
+        with self.lock:
+            row = self.db.execute("SELECT size, chunks FROM files WHERE hash = ?", (file_hash,)).fetchone()
+        if row is None:
+            return None
+        return row[0], [h for h in row[1].split(',') if h]
+
+    def iter_range(self, file_hash, start, end):
+        """Yield the bytes start..end (exclusive) of a stored file
+
+        Chunks are fixed size, so the first chunk of a range is found
+        directly and each chunk is read through mmap. The file counts as
+        being read until the generator finishes or is closed, so a
+        concurrent release cannot delete its chunks mid-download.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT size, chunks FROM files WHERE hash = ?", (file_hash,)).fetchone()
+            if row is None:
+                raise KeyError(file_hash)
+            self.readers[file_hash] = self.readers.get(file_hash, 0) + 1
+        size, chunks = row[0], [h for h in row[1].split(',') if h]
+        end = min(end, size)
+
+        try:
+            position = start
+            while position < end:
+                index, skip = divmod(position, self.chunk_size)
+                with open(self.chunk_path(chunks[index]), 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    take = min(len(mapped) - skip, end - position)
+                    for block_start in range(skip, skip + take, READ_BLOCK):
+                        yield mapped[block_start:min(block_start + READ_BLOCK, skip + take)]
+                position += take
+        finally:
+            self._finish_read(file_hash)
+
+    def _finish_read(self, file_hash):
+        with self.lock:
+            self.readers[file_hash] -= 1
+            if self.readers[file_hash]:
+                return
+            del self.readers[file_hash]
+            deferred = self.pending_releases.pop(file_hash, 0)
+        for _ in range(deferred):
+            try:
+                self.release(file_hash)
+            except KeyError:
+                pass
+
+    def stats(self):
+        """Unique bytes on disk against bytes referenced by owners"""
+        with self.lock:
+            chunk_count, stored = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chunks").fetchone()
+            file_count, logical = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size * refs), 0) FROM files").fetchone()
+        return {
+            'chunks': chunk_count,
+            'files': file_count,
+            'stored_bytes': stored,
+            'referenced_bytes': logical,
+            'pending_uploads': len(self.uploads)
+        }
@@ -5,47 +5,67 @@ import hashlib
 import json
 from typing import Tuple, Optional
 import base64
+from signature_schemes import DEFAULT_SCHEME, get_scheme
+
+# Transaction fields that are not covered by its signature
+UNSIGNED_FIELDS = ('signature', 'signature_algorithm', 'quantum_resistant', 'public_key')
+
+
+def public_key_address(public_key: bytes) -> str:
+    """QRC address of a public key"""
+    # Hash the public key, take the first 20 bytes and encode with the QRC prefix
+    addr_bytes = hashlib.sha3_256(public_key).digest()[:20]
+    return 'QRC' + base64.b32encode(addr_bytes).decode('utf-8').rstrip('=')
+
+
+def transaction_signing_bytes(transaction: dict) -> bytes:
+    """Canonical bytes a transaction signature covers"""
+    tx_data = {k: v for k, v in transaction.items() if k not in UNSIGNED_FIELDS}
+    return json.dumps(tx_data, sort_keys=True).encode('utf-8')
+
 
 class DilithiumSigner:
     """
-    CRYSTALS-Dilithium quantum-resistant digital signature implementation
-    Using Dilithium2 (NIST Level 2 Security)
+    Quantum-resistant digital signatures for one registered scheme
+    Defaults to CRYSTALS-Dilithium2 (NIST Level 2 Security); see
+    signature_schemes for Dilithium3/5, Falcon-512 and SPHINCS+
     """
     
-    # Dilithium2 parameters
+    # Dilithium2 parameters; instances carry their own scheme's sizes
     PUBLICKEYBYTES = 1312
     SECRETKEYBYTES = 2528
     SIGNBYTES = 2420
+    SEEDBYTES = 32
+    
+    def __init__(self, algorithm: str = DEFAULT_SCHEME):
+        """Initialize the signer for a registered signature scheme"""
+        self.scheme = get_scheme(algorithm)
+        self.algorithm = self.scheme.algorithm
+        self.PUBLICKEYBYTES = self.scheme.public_key_bytes
+        self.SECRETKEYBYTES = self.scheme.secret_key_bytes
+        self.SIGNBYTES = self.scheme.signature_bytes
     
-    def __init__(self):
-        """Initialize Dilithium with proper library loading"""
-        self.lib = None
-        self._load_library()
+    def generate_seed(self) -> bytes:
+        """Generate the 32-byte seed a keypair is derived from"""
+        return self.scheme.generate_seed()
     
-    def _load_library(self):
-        """Load the Dilithium shared library"""
-        # For now, we'll simulate the functions
-        # In production, this would load the actual C library
-        pass
+    def keypair_from_seed(self, seed: bytes) -> Tuple[bytes, bytes]:
+        """
+        Deterministically derive a keypair from its seed
+        Recently used seeds are served from a bounded LRU cache
+        """
+        return self.scheme.keypair_from_seed(seed)
     
     def generate_keypair(self) -> Tuple[bytes, bytes]:
         """
-        Generate a new Dilithium keypair
+        Generate a new keypair
         Returns: (public_key, secret_key) as bytes
         """
-        # Simulate keypair generation
-        # In production, this calls the C library
-        import secrets
-        
-        # Generate random keys of correct size
-        public_key = secrets.token_bytes(self.PUBLICKEYBYTES)
-        secret_key = secrets.token_bytes(self.SECRETKEYBYTES)
-        
-        return public_key, secret_key
+        return self.scheme.expand_seed(self.generate_seed())
     
     def sign(self, message: bytes, secret_key: bytes) -> bytes:
         """
-        Sign a message using Dilithium
+        Sign a message
         
         Args:
             message: Message to sign
@@ -54,21 +74,11 @@ class DilithiumSigner:
         Returns:
             signature: Digital signature
         """
-        # Simulate signing
-        # In production, this calls crypto_sign_signature
-        import secrets
-        
-        # Hash the message
-        h = hashlib.sha3_256(message).digest()
-        
-        # Generate signature of correct size
-        signature = secrets.token_bytes(self.SIGNBYTES)
-        
-        return signature
+        return self.scheme.sign(message, secret_key)
     
     def verify(self, signature: bytes, message: bytes, public_key: bytes) -> bool:
         """
-        Verify a Dilithium signature
+        Verify a signature
         
         Args:
             signature: Digital signature to verify
@@ -78,79 +88,95 @@ class DilithiumSigner:
         Returns:
             bool: True if signature is valid
         """
-        # Simulate verification
-        # In production, this calls crypto_sign_verify
-        
-        # Basic length checks
-        if len(signature) != self.SIGNBYTES:
-            return False
-        if len(public_key) != self.PUBLICKEYBYTES:
-            return False
-            
-        # In real implementation, this would perform lattice-based verification
-        return True
+        return self.scheme.verify(signature, message, public_key)
     
     def export_keys(self, public_key: bytes, secret_key: bytes) -> dict:
         """Export keys in JSON-friendly format"""
         return {
-            'algorithm': 'CRYSTALS-Dilithium2',
+            'algorithm': self.algorithm,
             'public_key': base64.b64encode(public_key).decode('utf-8'),
             'secret_key': base64.b64encode(secret_key).decode('utf-8'),
-            'security_level': 2,
+            'security_level': self.scheme.nist_level,
+            'quantum_resistant': True
+        }
+    
+    def export_seed(self, seed: bytes) -> dict:
+        """Export only the seed; the keypair is re-derived on import"""
+        return {
+            'algorithm': self.algorithm,
+            'seed': base64.b64encode(seed).decode('utf-8'),
+            'security_level': self.scheme.nist_level,
             'quantum_resistant': True
         }
     
     def import_keys(self, key_data: dict) -> Tuple[bytes, bytes]:
-        """Import keys from JSON format"""
+        """Import keys from JSON format (full keys or a seed)"""
+        if 'seed' in key_data:
+            scheme = get_scheme(key_data.get('algorithm', self.algorithm))
+            return scheme.keypair_from_seed(base64.b64decode(key_data['seed']))
         public_key = base64.b64decode(key_data['public_key'])
         secret_key = base64.b64decode(key_data['secret_key'])
         return public_key, secret_key
 
 
 class QuantumResistantWallet:
-    """Wallet implementation using Dilithium signatures"""
+    """Wallet implementation using Dilithium signatures (or another registered scheme)"""
     
-    def __init__(self):
-        self.signer = DilithiumSigner()
+    def __init__(self, algorithm: str = DEFAULT_SCHEME):
+        self.signer = DilithiumSigner(algorithm)
+        self.seed = None
         self.public_key = None
-        self.secret_key = None
         self.address = None
     
+    @property
+    def secret_key(self) -> Optional[bytes]:
+        """Expanded from the seed on demand rather than stored"""
+        if self.seed is None:
+            return None
+        return self.signer.keypair_from_seed(self.seed)[1]
+    
+    @classmethod
+    def from_seed(cls, seed: bytes, algorithm: str = DEFAULT_SCHEME) -> 'QuantumResistantWallet':
+        """Restore a wallet from its 32-byte seed"""
+        wallet = cls(algorithm)
+        wallet.seed = seed
+        wallet.public_key = wallet.signer.keypair_from_seed(seed)[0]
+        wallet.address = wallet._generate_address(wallet.public_key)
+        return wallet
+    
     def create_new_wallet(self) -> dict:
         """Create a new quantum-resistant wallet"""
-        # Generate Dilithium keypair
-        self.public_key, self.secret_key = self.signer.generate_keypair()
+        # Generate the seed; the keypair is derived from it
+        self.seed = self.signer.generate_seed()
+        self.public_key = self.signer.scheme.expand_seed(self.seed)[0]
         
         # Generate address from public key
         self.address = self._generate_address(self.public_key)
         
         return {
             'address': self.address,
-            'algorithm': 'CRYSTALS-Dilithium2',
+            'algorithm': self.signer.algorithm,
             'public_key_size': len(self.public_key),
             'signature_size': self.signer.SIGNBYTES
         }
     
     def _generate_address(self, public_key: bytes) -> str:
         """Generate a QRC address from public key"""
-        # Hash the public key
-        h = hashlib.sha3_256(public_key).digest()
-        
-        # Take first 20 bytes and encode
-        addr_bytes = h[:20]
-        
-        # Add QRC prefix and encode
-        address = 'QRC' + base64.b32encode(addr_bytes).decode('utf-8').rstrip('=')
-        
-        return address
+        return public_key_address(public_key)
     
-    def sign_transaction(self, transaction_data: dict) -> dict:
-        """Sign a transaction with Dilithium"""
+    def sign_transaction(self, transaction_data: dict, reveal_public_key: bool = False) -> dict:
+        """
+        Sign a transaction with Dilithium
+        
+        The public key is only attached when reveal_public_key is set,
+        which is needed until a transaction from this address that
+        carries it has been mined
+        """
         if not self.secret_key:
             raise ValueError("No secret key available")
         
         # Serialize transaction data
-        tx_bytes = json.dumps(transaction_data, sort_keys=True).encode('utf-8')
+        tx_bytes = transaction_signing_bytes(transaction_data)
         
         # Sign with Dilithium
         signature = self.signer.sign(tx_bytes, self.secret_key)
@@ -159,28 +185,40 @@ class QuantumResistantWallet:
         signed_tx = {
             **transaction_data,
             'signature': base64.b64encode(signature).decode('utf-8'),
-            'signature_algorithm': 'CRYSTALS-Dilithium2',
+            'signature_algorithm': self.signer.algorithm,
             'quantum_resistant': True
         }
+        if reveal_public_key:
+            signed_tx['public_key'] = base64.b64encode(self.public_key).decode('utf-8')
         
         return signed_tx
     
-    def verify_transaction(self, signed_transaction: dict) -> bool:
-        """Verify a quantum-resistant transaction signature"""
+    def verify_transaction(self, signed_transaction: dict, registry=None) -> bool:
+        """
+        Verify a quantum-resistant transaction signature
+        
+        The sender's key comes from the transaction if it reveals one,
+        otherwise from registry (a PublicKeyRegistry) or this wallet
+        """
         try:
             # Extract signature
             signature = base64.b64decode(signed_transaction['signature'])
             
-            # Remove signature from transaction data
-            tx_data = {k: v for k, v in signed_transaction.items() 
-                      if k not in ['signature', 'signature_algorithm', 'quantum_resistant']}
-            
-            # Serialize transaction data
-            tx_bytes = json.dumps(tx_data, sort_keys=True).encode('utf-8')
+            # Get public key from sender address
+            sender = signed_transaction.get('sender')
+            if registry is not None:
+                public_key, _ = registry.resolve(signed_transaction)
+            elif 'public_key' in signed_transaction:
+                public_key = base64.b64decode(signed_transaction['public_key'])
+                if public_key_address(public_key) != sender:
+                    return False
+            elif sender == self.address and self.public_key:
+                public_key = self.public_key
+            else:
+                return False
             
-            # Get public key from sender address (in real implementation)
-            # For now, we'll assume it's valid
-            return True
+            scheme = get_scheme(signed_transaction.get('signature_algorithm', self.signer.algorithm))
+            return scheme.verify(signature, transaction_signing_bytes(signed_transaction), public_key)
             
         except Exception as e:
             print(f"Verification error: {e}")
@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Smallest fee unit (matches the 0.00000001 quantization used for fees)
+FEE_BASE_UNITS = 10 ** 8
+
 class FeeManager:
     """Manages all fee calculations and distributions for PQC Blockchain"""
     
@@ -60,35 +63,62 @@ class FeeManager:
             "network_fee": float(network_share.quantize(Decimal("0.00000001"), rounding=ROUND_DOWN))
         }
     
-    def create_fee_transactions(self, sender, amount, signature, timestamp):
-        """Create the actual fee distribution transactions"""
-        fees = self.calculate_transaction_fee(amount)
-        
-        fee_transactions = []
-        
-        # Developer fee transaction
-        if fees["developer_fee"] > 0:
-            fee_transactions.append({
-                "sender": sender,
-                "recipient": self.developer_address,
-                "amount": fees["developer_fee"],
-                "timestamp": timestamp + 0.001,  # Slightly after main transaction
-                "type": "developer_fee",
-                "signature": signature  # Same signature validates fee payment
-            })
-        
-        # Network fee transaction
-        if fees["network_fee"] > 0:
-            fee_transactions.append({
-                "sender": sender,
-                "recipient": self.treasury_address,
-                "amount": fees["network_fee"],
-                "timestamp": timestamp + 0.002,  # Slightly after developer fee
-                "type": "network_fee",
-                "signature": signature
-            })
-        
-        return fee_transactions, fees
+    def calculate_transaction_fees(self, amounts):
+        """Calculate fees for many transaction amounts in one pass
+
+        Works in integer base units (1e-8 QRC) so every quote matches
+        calculate_transaction_fee exactly. Returns parallel lists.
+        """
+        # Fee parameters as exact integer ratios
+        pct_num, pct_den = self.fees["transaction_fee_percentage"].as_integer_ratio()
+        share = self.fees["developer_fee_percentage"] / self.fees["transaction_fee_percentage"]
+        share_num, share_den = share.as_integer_ratio()
+        minimum = int(self.fees["minimum_fee"] * FEE_BASE_UNITS)
+        scale = Decimal(FEE_BASE_UNITS)
+
+        units = []
+        for i, amount in enumerate(amounts):
+            if isinstance(amount, int) and not isinstance(amount, bool):
+                value = amount * FEE_BASE_UNITS
+            else:
+                try:
+                    value = int(Decimal(str(amount)) * scale)
+                except Exception:
+                    raise ValueError(f"Invalid amount at index {i}: {amount!r}")
+            if value < 0:
+                raise ValueError(f"Invalid amount at index {i}: {amount!r}")
+            units.append(value)
+
+        # Percentage fee vs minimum floor, split with floor rounding
+        minimum_scaled = minimum * pct_den
+        fee_den = pct_den * share_den
+        total_units = []
+        developer_units = []
+        network_units = []
+        for value in units:
+            scaled = value * pct_num
+            if scaled >= minimum_scaled:
+                total_units.append(scaled // pct_den)
+                developer_units.append(scaled * share_num // fee_den)
+                network_units.append(scaled * (share_den - share_num) // fee_den)
+            else:
+                total_units.append(minimum)
+                developer_units.append(minimum * share_num // share_den)
+                network_units.append(minimum * (share_den - share_num) // share_den)
+
+        return {
+            "total_fee": [u / FEE_BASE_UNITS for u in total_units],
+            "developer_fee": [u / FEE_BASE_UNITS for u in developer_units],
+            "network_fee": [u / FEE_BASE_UNITS for u in network_units],
+            "total_fee_units": total_units,
+            "amount_units": units
+        }
+    
+    def record_fees(self, transaction, fee_structure):
+        """Record the fee split on the transaction that paid it"""
+        transaction["developer_fee"] = fee_structure.get("developer_fee", 0)
+        transaction["network_fee"] = fee_structure.get("network_fee", 0)
+        return transaction
     
     def calculate_feature_fee(self, feature_type, **kwargs):
         """Calculate fee for blockchain features (tokens, names, storage)"""
@@ -105,30 +135,32 @@ class FeeManager:
         return {
             "total_fee": total_fee,
             "developer_fee": total_fee,  # 100% goes to developer for features
-            "network_fee": 0,
-            "fee_transactions": [
-                {
-                    "recipient": self.developer_address,
-                    "amount": total_fee,
-                    "type": f"{feature_type}_fee"
-                }
-            ]
+            "network_fee": 0
         }
     
-    def create_fee_distribution_transactions(self, main_transaction, fee_structure):
-        """Create fee distribution transactions for features"""
-        fee_transactions = []
-        timestamp = main_transaction.get('timestamp', time.time())
+    def create_block_fee_payout(self, transactions, timestamp=None):
+        """Create one payout record crediting a block's fees to the fee addresses"""
+        developer_units = 0
+        network_units = 0
         
-        for i, fee_tx in enumerate(fee_structure.get('fee_transactions', [])):
-            fee_transactions.append({
-                "sender": main_transaction['sender'],
-                "recipient": fee_tx['recipient'],
-                "amount": fee_tx['amount'],
-                "timestamp": timestamp + (0.001 * (i + 1)),
-                "type": fee_tx['type'],
-                "signature": main_transaction.get('signature', ''),
-                "quantum_resistant": True
-            })
-            
-        return fee_transactions
\ No newline at end of file
+        for transaction in transactions:
+            developer_units += round(transaction.get("developer_fee", 0) * FEE_BASE_UNITS)
+            network_units += round(transaction.get("network_fee", 0) * FEE_BASE_UNITS)
+        
+        if not developer_units and not network_units:
+            return None
+        
+        payouts = {}
+        if developer_units:
+            payouts[self.developer_address] = developer_units
+        if network_units:
+            payouts[self.treasury_address] = payouts.get(self.treasury_address, 0) + network_units
+        
+        return {
+            "sender": "NETWORK_FEES",
+            "type": "fee_payout",
+            "payouts": {address: units / FEE_BASE_UNITS for address, units in payouts.items()},
+            "developer_fees": developer_units / FEE_BASE_UNITS,
+            "network_fees": network_units / FEE_BASE_UNITS,
+            "timestamp": timestamp if timestamp is not None else time.time()
+        }
@@ -0,0 +1,97 @@
+# keypair_pool.py
+import multiprocessing
+import queue
+import threading
+import time
+from dilithium_wrapper import QuantumResistantWallet
+from signature_schemes import DEFAULT_SCHEME
+
+
+def generate_entry(algorithm=DEFAULT_SCHEME):
+    """(address, seed) for a fresh wallet; its keypair derives from the seed"""
+    wallet = QuantumResistantWallet(algorithm)
+    info = wallet.create_new_wallet()
+    return info['address'], wallet.seed
+
+
+def _fill_pool(entries, depth, refill, generated, last_rate, capacity, algorithm):
+    """Worker process: top the queue up to capacity whenever refill is set"""
+    while True:
+        refill.wait()
+        refill.clear()
+        started = time.time()
+        made = 0
+        while depth.value < capacity:
+            entries.put(generate_entry(algorithm))
+            with depth.get_lock():
+                depth.value += 1
+            made += 1
+        if made:
+            with generated.get_lock():
+                generated.value += made
+            last_rate.value = made / max(time.time() - started, 1e-9)
+
+
+class KeypairPool:
+    """Keeps fresh wallets (address and key seed) ready for wallet creation
+
+    A worker process fills a bounded queue up to capacity and then
+    sleeps. pop() takes one entry without waiting; when the queue falls
+    to low_water the worker is woken to refill it. If the queue is empty
+    the keypair is generated inline instead.
+    """
+
+    def __init__(self, capacity=1000, low_water=250, algorithm=DEFAULT_SCHEME):
+        self.capacity = capacity
+        self.low_water = low_water
+        self.algorithm = algorithm
+        context = multiprocessing.get_context()
+        self.entries = context.Queue(capacity)
+        self.depth = context.Value('i', 0)
+        self.generated = context.Value('q', 0)
+        self.last_rate = context.Value('d', 0.0)   # Keypairs per second during the last refill
+        self.refill = context.Event()
+        self.process = context.Process(
+            target=_fill_pool,
+            args=(self.entries, self.depth, self.refill, self.generated, self.last_rate, capacity, algorithm),
+            name='keypair-pool',
+            daemon=True
+        )
+        self.lock = threading.Lock()
+        self.stats = {'served_from_pool': 0, 'generated_inline': 0, 'refills': 0}
+
+    def start(self):
+        if not self.process.is_alive():
+            self.process.start()
+            self.refill.set()
+
+    def pop(self):
+        """(address, seed), from the pool when possible"""
+        try:
+            entry = self.entries.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                self.stats['generated_inline'] += 1
+            return generate_entry(self.algorithm)
+
+        with self.depth.get_lock():
+            self.depth.value -= 1
+            depth = self.depth.value
+        with self.lock:
+            self.stats['served_from_pool'] += 1
+            if depth <= self.low_water and not self.refill.is_set():
+                self.refill.set()
+                self.stats['refills'] += 1
+        return entry
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'depth': self.depth.value,
+                'capacity': self.capacity,
+                'low_water': self.low_water,
+                'generated_by_worker': self.generated.value,
+                'refill_rate_per_second': round(self.last_rate.value, 1),
+                'worker_alive': self.process.is_alive(),
+                **self.stats
+            }
@@ -0,0 +1,79 @@
+# message_index.py
+import sys
+import threading
+
+
+class Message:
+    """One on-chain message, shared by the inbox and thread that list it"""
+
+    __slots__ = ('id', 'sender', 'recipient', 'text', 'encrypted', 'timestamp')
+
+    def __init__(self, message_id, sender, recipient, text, encrypted, timestamp):
+        self.id = message_id
+        self.sender = sender
+        self.recipient = recipient
+        self.text = text
+        self.encrypted = encrypted
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "from": self.sender,
+            "to": self.recipient,
+            "message": self.text,
+            "encrypted": self.encrypted,
+            "timestamp": self.timestamp
+        }
+
+
+def thread_key(a, b):
+    """Both directions of a conversation share one thread"""
+    return (a, b) if a <= b else (b, a)
+
+
+class MessageIndex:
+    """Append-only message logs per recipient and per conversation
+
+    A page is a slice from the end of a log, so reading an inbox costs
+    the page size no matter how many messages it holds. Cursors are log
+    positions and stay valid as new messages arrive.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inboxes = {}   # recipient -> [Message]
+        self.threads = {}   # (address, address) -> [Message]
+        self.count = 0
+
+    def record(self, transaction):
+        """Index a 'message' transaction"""
+        # Addresses repeat across many messages, so keep one copy of each
+        sender = sys.intern(transaction['sender'])
+        recipient = sys.intern(transaction['recipient'])
+        with self.lock:
+            self.count += 1
+            message = Message(
+                self.count, sender, recipient, transaction.get('message', ''),
+                bool(transaction.get('encrypted')), transaction.get('timestamp')
+            )
+            self.inboxes.setdefault(recipient, []).append(message)
+            self.threads.setdefault(thread_key(sender, recipient), []).append(message)
+        return message
+
+    @staticmethod
+    def _page(log, cursor, limit):
+        """Newest messages before position cursor, and the next cursor"""
+        end = len(log) if cursor is None else min(max(cursor, 0), len(log))
+        start = max(end - limit, 0)
+        return log[start:end][::-1], (start if start > 0 else None)
+
+    def inbox(self, recipient, cursor=None, limit=50):
+        with self.lock:
+            log = self.inboxes.get(recipient, [])
+            return self._page(log, cursor, limit) + (len(log),)
+
+    def thread(self, a, b, cursor=None, limit=50):
+        with self.lock:
+            log = self.threads.get(thread_key(a, b), [])
+            return self._page(log, cursor, limit) + (len(log),)
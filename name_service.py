@@ -0,0 +1,157 @@
+# name_service.py
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from sorted_index import SortedIndex
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+class NameRecord:
+    """Ownership of one registered name (times are epoch seconds)"""
+
+    __slots__ = ('name', 'owner', 'registered', 'expires')
+
+    def __init__(self, name, owner, registered, expires):
+        self.name = name
+        self.owner = owner
+        self.registered = registered
+        self.expires = expires
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'registered': datetime.fromtimestamp(self.registered).isoformat(),
+            'expires': datetime.fromtimestamp(self.expires).isoformat()
+        }
+
+
+class NameService:
+    """Registered names with prefix search, owner index and expiry
+
+    Names are kept in a sorted index so a prefix search is a bisect plus a
+    short scan. Expiries sit in a min-heap; the sweeper pops only the names
+    that are due, so releasing a name costs O(log n).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.records = {}                 # name -> NameRecord
+        self.index = SortedIndex()        # Registered names in sorted order
+        self.by_owner = defaultdict(set)  # owner -> names
+        self.expiries = []                # (expires, name) min-heap
+        self.released = 0
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, name, now=None):
+        """Active record for a name, or None if it is free"""
+        now = time.time() if now is None else now
+        record = self.records.get(name)
+        if record is None or record.expires <= now:
+            return None
+        return record
+
+    def is_available(self, name, now=None):
+        return self.lookup(name, now) is None
+
+    def register(self, name, owner, years=1, now=None):
+        """Register a free name, raising ValueError if it is taken"""
+        if years < 1:
+            raise ValueError("Registration must be for at least one year")
+        now = time.time() if now is None else now
+
+        with self.lock:
+            if self.lookup(name, now) is not None:
+                raise ValueError("Name already taken")
+            if name in self.records:
+                self._release(name)  # Expired but not swept yet
+
+            record = NameRecord(name, owner, now, now + years * SECONDS_PER_YEAR)
+            self.records[name] = record
+            self.index.add(name)
+            self.by_owner[owner].add(name)
+            heapq.heappush(self.expiries, (record.expires, name))
+            return record
+
+    def _release(self, name):
+        record = self.records.pop(name)
+        self.index.remove(name)
+        names = self.by_owner.get(record.owner)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self.by_owner[record.owner]
+        self.released += 1
+
+    def sweep(self, now=None):
+        """Release every expired name, returning how many were freed"""
+        now = time.time() if now is None else now
+        released = 0
+        with self.lock:
+            while self.expiries and self.expiries[0][0] <= now:
+                expires, name = heapq.heappop(self.expiries)
+                record = self.records.get(name)
+                # Skip stale entries for names released or re-registered since
+                if record is not None and record.expires == expires:
+                    self._release(name)
+                    released += 1
+        return released
+
+    def search(self, prefix, limit=20, after=None, now=None):
+        """Active names starting with prefix, in order
+
+        after continues a previous search from the last name it returned.
+        """
+        now = time.time() if now is None else now
+        results = []
+        with self.lock:
+            start, inclusive = (after, False) if after and after >= prefix else (prefix, True)
+            for name in self.index.iter_from(start, inclusive):
+                if not name.startswith(prefix):
+                    break
+                record = self.records[name]
+                if record.expires > now:
+                    results.append(record)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def names_of(self, owner, now=None):
+        """Active names held by an owner"""
+        now = time.time() if now is None else now
+        with self.lock:
+            records = (self.records[name] for name in self.by_owner.get(owner, ()))
+            return sorted(
+                (record for record in records if record.expires > now),
+                key=lambda record: record.name
+            )
+
+    def start_sweeper(self, interval=60):
+        """Release expired names from a background thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=run, daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'registered': len(self.records),
+            'owners': len(self.by_owner),
+            'pending_expiries': len(self.expiries),
+            'released': self.released
+        }
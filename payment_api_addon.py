@@ -1,11 +1,16 @@
-# payment_api_addon.py - Add these routes to your quantum_blockchain_server_v3.py
+# payment_api_addon.py - Add these routes to your pqc_blockchain_server_enhanced.py
 
 # Add these imports at the top
-import uuid
-import hashlib
+from payment_watcher import DEFAULT_PAYMENT_TTL, PaymentStatus
 
-# Payment tracking
-payments = {}  # In production, use a database
+# Payments are tracked by blockchain.payments (a PaymentWatcher), which
+# matches admitted and mined transactions to open requests automatically
+
+# Longest a status request may wait for a change
+MAX_PAYMENT_WAIT = 60
+
+# Longest a payment request may stay open (seconds)
+MAX_PAYMENT_TTL = 7 * 24 * 3600
 
 @app.route('/api/payment/create', methods=['POST'])
 def create_payment_request():
@@ -18,26 +23,16 @@ def create_payment_request():
         merchant_wallet = data.get('merchant_wallet')
         description = data.get('description', '')
         callback_url = data.get('callback_url', '')
+        expires_in = int(data.get('expires_in', DEFAULT_PAYMENT_TTL))
         
         if not merchant_wallet or amount <= 0:
             return jsonify({'success': False, 'error': 'Invalid payment details'})
         
-        # Generate unique payment ID
-        payment_id = str(uuid.uuid4())
-        
-        # Create payment request
-        payment = {
-            'id': payment_id,
-            'merchant_wallet': merchant_wallet,
-            'amount': amount,
-            'description': description,
-            'callback_url': callback_url,
-            'status': 'pending',
-            'created_at': datetime.now().isoformat(),
-            'tx_hash': None
-        }
+        if not 60 <= expires_in <= MAX_PAYMENT_TTL:
+            return jsonify({'success': False, 'error': f'expires_in must be between 60 and {MAX_PAYMENT_TTL} seconds'})
         
-        payments[payment_id] = payment
+        payment = blockchain.payments.create(merchant_wallet, amount, description, callback_url, ttl=expires_in)
+        payment_id = payment.id
         
         # Generate payment URL
         payment_url = f"https://pqc-blockchain.onrender.com/pay/{payment_id}"
@@ -47,7 +42,9 @@ def create_payment_request():
             'payment_id': payment_id,
             'payment_url': payment_url,
             'amount': amount,
-            'merchant_wallet': merchant_wallet
+            'merchant_wallet': merchant_wallet,
+            'payment_reference': payment_id,
+            'expires_at': payment.to_dict()['expires_at']
         })
         
     except Exception as e:
@@ -55,15 +52,32 @@ def create_payment_request():
 
 @app.route('/api/payment/status/<payment_id>')
 def check_payment_status(payment_id):
-    """Check payment status"""
-    payment = payments.get(payment_id)
+    """Check payment status
+
+    With ?wait=<seconds>&status=<last seen status> the request is held
+    until the status changes or the wait runs out (long polling).
+    """
+    payment = blockchain.payments.get(payment_id)
     
     if not payment:
+        # Finished payments move to the archive after the retention window
+        archived = blockchain.payments.find_archived(payment_id)
+        if archived:
+            return jsonify({'success': True, 'payment': archived})
         return jsonify({'success': False, 'error': 'Payment not found'})
     
+    try:
+        wait = min(float(request.args.get('wait', 0) or 0), MAX_PAYMENT_WAIT)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'wait must be a number'})
+    if wait > 0:
+        payment = blockchain.payments.wait(payment_id, request.args.get('status', payment.status.label), wait)
+        if payment is None:
+            return jsonify({'success': False, 'error': 'Payment not found'})
+    
     return jsonify({
         'success': True,
-        'payment': payment
+        'payment': payment.to_dict()
     })
 
 @app.route('/pay/<payment_id>')
@@ -73,27 +87,23 @@ def payment_page(payment_id):
 
 @app.route('/api/payment/complete', methods=['POST'])
 def complete_payment():
-    """Mark payment as complete when transaction is confirmed"""
+    """Report the payment's status
+
+    Payments are completed by the watcher when their transaction is
+    mined, so clients no longer need to call this.
+    """
     try:
         data = request.json
         payment_id = data.get('payment_id')
-        tx_hash = data.get('tx_hash')
         
-        payment = payments.get(payment_id)
+        payment = blockchain.payments.get(payment_id)
         if not payment:
             return jsonify({'success': False, 'error': 'Payment not found'})
         
-        # Update payment status
-        payment['status'] = 'completed'
-        payment['tx_hash'] = tx_hash
-        payment['completed_at'] = datetime.now().isoformat()
+        if payment.status in (PaymentStatus.PENDING, PaymentStatus.EXPIRED):
+            return jsonify({'success': False, 'error': 'Payment has not been received', 'payment': payment.to_dict()})
         
-        # In production, trigger webhook to merchant
-        if payment['callback_url']:
-            # Send webhook notification
-            pass
-        
-        return jsonify({'success': True, 'payment': payment})
+        return jsonify({'success': True, 'payment': payment.to_dict()})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -111,7 +121,8 @@ def api_documentation():
                     'amount': 'float - Amount in QRC',
                     'merchant_wallet': 'string - Your QRC wallet address',
                     'description': 'string - Payment description',
-                    'callback_url': 'string - Webhook URL for notifications'
+                    'callback_url': 'string - Webhook URL for notifications',
+                    'expires_in': 'int - Seconds the request stays open (default 3600)'
                 },
                 'response': {
                     'payment_id': 'string - Unique payment ID',
@@ -121,9 +132,13 @@ def api_documentation():
             'check_status': {
                 'url': '/api/payment/status/{payment_id}',
                 'method': 'GET',
+                'params': {
+                    'wait': 'float - Optional seconds to wait for a status change (max 60)',
+                    'status': 'string - Last status seen, used with wait'
+                },
                 'response': {
-                    'status': 'pending | completed | failed',
-                    'tx_hash': 'string - Transaction hash when completed'
+                    'status': 'pending | detected | completed | expired',
+                    'tx_hash': 'string - Transaction hash once detected'
                 }
             }
         },
@@ -0,0 +1,312 @@
+# payment_watcher.py
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from enum import IntEnum
+from fee_manager import FEE_BASE_UNITS
+
+DEFAULT_PAYMENT_TTL = 3600            # Seconds a request stays open
+DEFAULT_RETENTION = 7 * 24 * 3600     # Seconds a finished request stays in memory
+
+
+class PaymentStatus(IntEnum):
+    PENDING = 0     # Waiting for a transaction
+    DETECTED = 1    # Matching transaction is in the mempool
+    COMPLETED = 2   # Matching transaction was mined
+    EXPIRED = 3     # Nothing arrived before the request expired
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+
+def amount_units(amount):
+    return round(float(amount) * FEE_BASE_UNITS)
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class PaymentRecord:
+    """One payment request; amounts in base units, times in epoch seconds"""
+
+    __slots__ = ('id', 'merchant_wallet', 'amount_units', 'description', 'callback_url',
+                 'status', 'created', 'expires', 'detected', 'completed', 'tx_hash', 'block')
+
+    def __init__(self, payment_id, merchant_wallet, units, description, callback_url, created, expires):
+        self.id = payment_id
+        self.merchant_wallet = merchant_wallet
+        self.amount_units = units
+        self.description = description or None
+        self.callback_url = callback_url or None
+        self.status = PaymentStatus.PENDING
+        self.created = created
+        self.expires = expires
+        self.detected = 0
+        self.completed = 0
+        self.tx_hash = None
+        self.block = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'merchant_wallet': self.merchant_wallet,
+            'amount': self.amount_units / FEE_BASE_UNITS,
+            'description': self.description or '',
+            'callback_url': self.callback_url or '',
+            'status': self.status.label,
+            'created_at': iso(self.created),
+            'expires_at': iso(self.expires),
+            'detected_at': iso(self.detected),
+            'completed_at': iso(self.completed),
+            'tx_hash': self.tx_hash,
+            'block': self.block
+        }
+
+    def size_bytes(self):
+        """Approximate memory held by this record and its own values"""
+        size = sys.getsizeof(self)
+        for name in ('id', 'description', 'callback_url', 'tx_hash'):
+            value = getattr(self, name)
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+
+class PaymentWatcher:
+    """Matches chain transactions to open payment requests
+
+    A transaction that carries a payment_reference is matched to that
+    request directly. Otherwise it settles the oldest open request for
+    the same merchant and exact amount. Both lookups are dictionary hits,
+    so every transaction is checked in O(1).
+
+    Open requests expire after their TTL. Completed and expired requests
+    are appended to an NDJSON archive and dropped from memory once the
+    retention window passes, so full records are only kept for recent
+    requests. Archived ones are found through an id -> file offset
+    index, built on the first archive lookup.
+    """
+
+    def __init__(self, events=None, archive_path=None, retention=DEFAULT_RETENTION):
+        self.events = events  # Optional EventBus, notified on every status change
+        self.archive_path = archive_path
+        self.retention = retention
+        self.changed = threading.Condition()
+        self.payments = {}                      # payment_id -> PaymentRecord
+        self.open_by_terms = {}                 # (merchant, amount units) -> deque of payment ids
+        self.by_transaction = {}                # transaction signature -> payment_id
+        self.expiries = []                      # (expires, payment_id) for open requests
+        self.archive_due = []                   # (archive time, payment_id) for finished requests
+        self.listeners = []                     # Called with each updated PaymentRecord
+        self.archived = 0
+        self.archive_lock = threading.Lock()
+        self.archive_index = None               # payment_id -> archive offset, once built
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def create(self, merchant_wallet, amount, description='', callback_url='', ttl=DEFAULT_PAYMENT_TTL, now=None):
+        now = int(time.time() if now is None else now)
+        payment = PaymentRecord(str(uuid.uuid4()), sys.intern(merchant_wallet), amount_units(amount),
+                                description, callback_url, now, now + int(ttl))
+        with self.changed:
+            self.payments[payment.id] = payment
+            self.open_by_terms.setdefault((payment.merchant_wallet, payment.amount_units), deque()).append(payment.id)
+            heapq.heappush(self.expiries, (payment.expires, payment.id))
+        return payment
+
+    def get(self, payment_id):
+        return self.payments.get(payment_id)
+
+    def _take_open(self, terms):
+        """Oldest still-pending request with these terms"""
+        queue = self.open_by_terms.get(terms)
+        while queue:
+            payment = self.payments.get(queue.popleft())
+            if payment is not None and payment.status == PaymentStatus.PENDING:
+                if not queue:
+                    del self.open_by_terms[terms]
+                return payment
+        self.open_by_terms.pop(terms, None)
+        return None
+
+    def _prune_terms(self, terms):
+        """Drop requests that are no longer open from the front of a queue"""
+        queue = self.open_by_terms.get(terms)
+        while queue and getattr(self.payments.get(queue[0]), 'status', None) != PaymentStatus.PENDING:
+            queue.popleft()
+        if queue is not None and not queue:
+            del self.open_by_terms[terms]
+
+    def _match(self, transaction):
+        recipient = transaction.get('recipient')
+        amount = transaction.get('amount')
+        if not recipient or not amount:
+            return None
+
+        reference = transaction.get('payment_reference')
+        if reference:
+            payment = self.payments.get(reference)
+            if payment and payment.status == PaymentStatus.PENDING and payment.merchant_wallet == recipient \
+                    and amount_units(amount) >= payment.amount_units:
+                return payment
+            return None
+
+        return self._take_open((recipient, amount_units(amount)))
+
+    def observe(self, transaction, confirmed=False, block_index=None):
+        """Update any payment a newly admitted or mined transaction settles"""
+        signature = transaction.get('txid') or transaction.get('signature')
+        now = int(time.time())
+        with self.changed:
+            payment_id = self.by_transaction.get(signature) if signature else None
+            if payment_id is not None:
+                payment = self.payments[payment_id]
+                if not confirmed or payment.status == PaymentStatus.COMPLETED:
+                    return None
+            else:
+                payment = self._match(transaction)
+                if payment is None:
+                    return None
+                payment.tx_hash = signature
+                payment.detected = now
+                if signature:
+                    self.by_transaction[signature] = payment.id
+
+            if confirmed:
+                payment.status = PaymentStatus.COMPLETED
+                payment.completed = now
+                payment.block = block_index
+                heapq.heappush(self.archive_due, (now + self.retention, payment.id))
+            else:
+                payment.status = PaymentStatus.DETECTED
+            self.changed.notify_all()
+
+        self._notify(payment)
+        return payment
+
+    def _notify(self, payment):
+        if self.events is not None:
+            self.events.publish(f"payment:{payment.id}", 'payment', {'payment': payment.to_dict()})
+        for listener in self.listeners:
+            listener(payment)
+
+    def wait(self, payment_id, known_status, timeout):
+        """Block until the payment's status label differs from known_status"""
+        def changed():
+            payment = self.payments.get(payment_id)
+            return payment is None or payment.status.label != known_status
+
+        with self.changed:
+            self.changed.wait_for(changed, timeout)
+            return self.payments.get(payment_id)
+
+    def sweep(self, now=None):
+        """Expire overdue open requests and archive finished ones past retention"""
+        now = int(time.time() if now is None else now)
+        expired = []
+        archived = []
+        with self.changed:
+            while self.expiries and self.expiries[0][0] <= now:
+                _, payment_id = heapq.heappop(self.expiries)
+                payment = self.payments.get(payment_id)
+                if payment is None or payment.status == PaymentStatus.COMPLETED:
+                    continue
+                if payment.status == PaymentStatus.PENDING:
+                    payment.status = PaymentStatus.EXPIRED
+                    expired.append(payment)
+                    self._prune_terms((payment.merchant_wallet, payment.amount_units))
+                # A detected payment that never confirms is archived as it stands
+                heapq.heappush(self.archive_due, (now + self.retention, payment_id))
+
+            while self.archive_due and self.archive_due[0][0] <= now:
+                _, payment_id = heapq.heappop(self.archive_due)
+                payment = self.payments.pop(payment_id, None)
+                if payment is not None:
+                    if payment.tx_hash:
+                        self.by_transaction.pop(payment.tx_hash, None)
+                    archived.append(payment)
+
+            if expired:
+                self.changed.notify_all()
+
+        if archived and self.archive_path:
+            with self.archive_lock, open(self.archive_path, 'ab') as archive:
+                for payment in archived:
+                    if self.archive_index is not None:
+                        self.archive_index[payment.id] = archive.tell()
+                    archive.write(json.dumps(payment.to_dict(), separators=(',', ':')).encode() + b'\n')
+        self.archived += len(archived)
+
+        for payment in expired:
+            self._notify(payment)
+        return len(expired), len(archived)
+
+    def _build_archive_index(self):
+        """Scan the archive once for the offset of each payment; call with archive_lock held"""
+        self.archive_index = {}
+        if not os.path.exists(self.archive_path):
+            return
+        with open(self.archive_path, 'rb') as archive:
+            offset = 0
+            for line in archive:
+                try:
+                    self.archive_index[sys.intern(json.loads(line)['id'])] = offset
+                except (ValueError, KeyError, TypeError):
+                    pass  # A line cut short by a crash
+                offset += len(line)
+
+    def find_archived(self, payment_id):
+        """Look a payment up in the archive with one seek"""
+        if not self.archive_path:
+            return None
+        with self.archive_lock:
+            if self.archive_index is None:
+                self._build_archive_index()
+            offset = self.archive_index.get(payment_id)
+            if offset is None:
+                return None
+            with open(self.archive_path, 'rb') as archive:
+                archive.seek(offset)
+                return json.loads(archive.readline())
+
+    def start_sweeper(self, interval=60):
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=run, daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def stats(self):
+        """Counts by status and the memory held by records in memory"""
+        with self.changed:
+            counts = dict.fromkeys((status.label for status in PaymentStatus), 0)
+            record_bytes = 0
+            for payment in self.payments.values():
+                counts[payment.status.label] += 1
+                record_bytes += payment.size_bytes()
+            return {
+                'in_memory': len(self.payments),
+                'by_status': counts,
+                'archived': self.archived,
+                'archive_index_entries': len(self.archive_index) if self.archive_index is not None else None,
+                'record_bytes': record_bytes,
+                'bytes_per_payment': round(record_bytes / len(self.payments)) if self.payments else 0,
+                'index_bytes': sys.getsizeof(self.payments) + sys.getsizeof(self.by_transaction)
+                + sys.getsizeof(self.open_by_terms) + sys.getsizeof(self.expiries)
+                + sys.getsizeof(self.archive_due)
+            }
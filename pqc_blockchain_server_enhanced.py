@@ -1,17 +1,37 @@
-from flask import Flask, jsonify, request, send_file, make_response
+from flask import Flask, jsonify, request, send_file, make_response, Response
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import hashlib
 import json
+import math
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 from collections import defaultdict
 import threading
 import random
-from dilithium_wrapper import DilithiumSigner, QuantumResistantWallet
-from fee_manager import FeeManager
+import mimetypes
+from urllib.parse import quote as url_quote
+from dilithium_wrapper import QuantumResistantWallet, transaction_signing_bytes
+from signature_schemes import SCHEMES, DEFAULT_SCHEME, get_scheme
+from fee_manager import FeeManager, FEE_BASE_UNITS
+from response_cache import ResponseCache
+from revenue_ledger import RevenueLedger
+from timeseries import RollupStore
+from token_ledger import TokenLedger
+from name_service import NameService
+from chunk_store import ChunkStore
+from storage_index import StorageIndex
+from message_index import MessageIndex
+from event_bus import EventBus
+from payment_watcher import PaymentWatcher, PaymentStatus
+from webhook_dispatcher import WebhookDispatcher
+from keypair_pool import KeypairPool
+from pubkey_registry import PublicKeyRegistry
+from witnesses import split_witnesses, witness_commitment, attach_witness, transaction_id, is_signed
+from bulk_wallets import WalletGenerator, KeystoreWriter
+from static_assets import StaticAssetStore
 from dotenv import load_dotenv
 import pyotp
 import jwt
@@ -46,11 +66,85 @@ limiter = Limiter(
 )
 
 
+# Static assets are loaded once and served from memory
+MAIN_PAGE = 'quantum_web_wallet.html'
+static_assets = StaticAssetStore(app.root_path)
+static_assets.load()
+
+# Signature scheme for wallets this node creates, and the schemes it accepts
+signature_scheme = get_scheme(os.getenv('SIGNATURE_SCHEME', DEFAULT_SCHEME))
+ACCEPTED_SIGNATURE_SCHEMES = {
+    get_scheme(name.strip()).algorithm
+    for name in os.getenv('ACCEPTED_SIGNATURE_SCHEMES', ','.join(SCHEMES)).split(',') if name.strip()
+} | {signature_scheme.algorithm}
+
+# Wallet keypairs are generated ahead of time by a worker process.
+# Started before any background threads so the fork is clean.
+keypair_pool = KeypairPool(
+    capacity=int(os.getenv('KEYPAIR_POOL_SIZE', 1000)),
+    low_water=int(os.getenv('KEYPAIR_POOL_LOW_WATER', 250)),
+    algorithm=signature_scheme.algorithm
+)
+keypair_pool.start()
+
+# Worker processes for bulk wallet creation, started up front for the same reason
+wallet_generator = WalletGenerator(
+    int(os.getenv('BULK_WALLET_WORKERS', min(4, os.cpu_count() or 1))),
+    algorithm=signature_scheme.algorithm
+)
+wallet_generator.start()
+KEYSTORE_DIR = os.getenv('KEYSTORE_DIR', os.path.join(app.root_path, 'keystores'))
+os.makedirs(KEYSTORE_DIR, exist_ok=True)
+
 # DDoS Protection
 request_counts = defaultdict(lambda: {"count": 0, "timestamp": time.time()})
 DDOS_THRESHOLD = 30  # Max requests per minute
 DDOS_BLOCK_TIME = 300  # 5 minutes block
 
+# Block listing page sizes
+DEFAULT_BLOCK_PAGE = 20
+MAX_HEADER_PAGE = 100  # Headers per page
+MAX_FULL_BLOCK_PAGE = 10  # Full blocks per page
+
+# Token holder page sizes
+DEFAULT_HOLDER_PAGE = 50
+MAX_HOLDER_PAGE = 500
+
+# Token gas fees (all goes to developer for token operations)
+TOKEN_TRANSFER_GAS = 0.1
+TOKEN_MULTI_TRANSFER_GAS_PER_RECIPIENT = 0.001
+
+# Batch limits
+MAX_FEE_QUOTE_BATCH = 10000  # Max amounts per fee quote request
+MAX_TRANSACTION_BATCH = 5000  # Max transfers per batch submission
+MAX_MULTI_TRANSFER_RECIPIENTS = 10000  # Max recipients per token multi-transfer
+
+# Name search page sizes
+DEFAULT_NAME_SEARCH = 20
+MAX_NAME_SEARCH = 200
+
+# Storage listing page sizes
+DEFAULT_STORAGE_PAGE = 50
+MAX_STORAGE_PAGE = 500
+
+# Message page sizes
+DEFAULT_MESSAGE_PAGE = 50
+MAX_MESSAGE_PAGE = 200
+
+# Bulk wallet creation
+MAX_WALLET_BATCH = 100000
+
+# Client-signed transfers older (or further ahead) than this are rejected
+SIGNED_TRANSFER_MAX_AGE = 600
+
+# Fields a client's transfer signature covers
+SIGNED_TRANSFER_FIELDS = ('sender', 'recipient', 'amount', 'timestamp', 'payment_reference')
+
+# Server-sent events
+MAX_EVENT_SUBSCRIBERS = 1000
+MAX_EVENT_TOPICS = 20
+EVENT_KEEPALIVE_SECONDS = 15
+
 def check_ddos(ip):
     """Check if IP should be blocked for DDoS"""
     current_time = time.time()
@@ -68,60 +162,252 @@ def check_ddos(ip):
 @app.before_request
 def ddos_protection():
     """Block requests from IPs exceeding threshold"""
+    # Static assets do not count against the per-IP budget
+    if request.endpoint in ('serve_main', 'serve_static'):
+        return
+    
     ip = get_remote_address()
     
     if check_ddos(ip):
         return jsonify({"error": "Too many requests. Please try again later."}), 429
 
 class QuantumBlock:
-    def __init__(self, index, transactions, timestamp, previous_hash, nonce=0):
+    def __init__(self, index, transactions, timestamp, previous_hash, nonce=0, witnesses=None):
         self.index = index
         self.transactions = transactions
         self.timestamp = timestamp
         self.previous_hash = previous_hash
         self.nonce = nonce
         self.quantum_signature = None
+        # Signatures are kept out of the transactions, keyed by txid, and
+        # only their commitment is hashed. None once they have been pruned.
+        self.witnesses = witnesses or {}
+        self.witness_commitment = witness_commitment(self.witnesses)
+        
+    def hashed_fields(self):
+        header = {
+            'index': self.index,
+            'transactions': self.transactions,
+            'timestamp': self.timestamp,
+            'previous_hash': self.previous_hash,
+            'nonce': self.nonce,
+            'quantum_signature': self.quantum_signature
+        }
+        if self.witness_commitment:
+            header['witness_commitment'] = self.witness_commitment
+        return header
         
     def compute_hash(self):
-        block_string = json.dumps(self.__dict__, sort_keys=True)
+        block_string = json.dumps(self.hashed_fields(), sort_keys=True)
         return hashlib.sha3_256(block_string.encode()).hexdigest()
 
 class QuantumBlockchain:
-    def __init__(self):
+    def __init__(self, fee_manager):
+        self.fee_manager = fee_manager
+        self.rollups = RollupStore()
+        self.revenue_ledger = RevenueLedger(fee_manager.developer_address, fee_manager.treasury_address, self.rollups)
+        self.messages = MessageIndex()
+        self.events = EventBus()
+        self.payments = PaymentWatcher(
+            self.events,
+            archive_path=os.getenv('PAYMENT_ARCHIVE', os.path.join(app.root_path, 'payment_archive.ndjson'))
+        )
         self.unconfirmed_transactions = []
         self.chain = []
         self.wallets = {}
         self.transaction_pool = []
         self.tps_data = {'current': 0, 'peak': 1773}
         self.mining_stats = {'total_mined': 0, 'total_fees': 0}
-        self.signer = DilithiumSigner()
+        self.fee_totals = {'developer_fees': 0, 'network_fees': 0, 'payouts': 0}
+        self.headers = []  # Compact header index, one entry per block
+        self.mempool_seq = 0  # Bumped on every admitted transaction or wallet change
+        self.txids = set()  # Signed transactions in the mempool or on chain, so replays are refused
+        self.witness_keep_blocks = int(os.getenv('WITNESS_KEEP_BLOCKS', 0))  # 0 keeps every witness
+        self.witness_checkpoint = int(os.getenv('WITNESS_CHECKPOINT', 0))  # Imports below this height may be pruned
+        self.pubkeys = PublicKeyRegistry(
+            os.getenv('PUBKEY_DB', os.path.join(app.root_path, 'pubkeys.db')),
+            cache_size=int(os.getenv('PUBKEY_CACHE_SIZE', 20000))
+        )
+        self.lock = threading.RLock()
+        self.mining_lock = threading.Lock()
         self.create_genesis_block()
         
     def create_genesis_block(self):
         genesis_block = QuantumBlock(0, [], time.time(), "0")
         genesis_block.hash = genesis_block.compute_hash()
         self.chain.append(genesis_block)
+        self.headers.append(self.block_header(genesis_block))
+
+    def block_header(self, block):
+        """Compact header used for block listings"""
+        return {
+            'index': block.index,
+            'hash': getattr(block, 'hash', ''),
+            'previous_hash': block.previous_hash,
+            'timestamp': block.timestamp,
+            'nonce': block.nonce,
+            'transaction_count': len(block.transactions),
+            'quantum_signature': getattr(block, 'quantum_signature', ''),
+            'witness_commitment': block.witness_commitment
+        }
 
     def add_transaction(self, transaction):
-        """Add a quantum-resistant signed transaction"""
-        # Verify quantum signature
-        if 'signature' in transaction and 'quantum_resistant' in transaction:
-            print(f"Processing quantum-resistant transaction with Dilithium signature")
+        """Add a quantum-resistant signed transaction
+
+        Raises ValueError if a signed transaction with the same id is
+        already in the mempool or on chain.
+        """
+        # Signed transactions are identified by their non-witness data
+        if is_signed(transaction):
+            transaction['txid'] = transaction_id(transaction)
         
-        self.unconfirmed_transactions.append(transaction)
-        self.transaction_pool.append(transaction)
+        with self.lock:
+            if 'txid' in transaction:
+                if transaction['txid'] in self.txids:
+                    raise ValueError("Transaction already submitted")
+                self.txids.add(transaction['txid'])
+            self.unconfirmed_transactions.append(transaction)
+            self.transaction_pool.append(transaction)
+        self._record_admitted(transaction)
+        # Bumped after the indexes so cached views never store stale bytes under the new version
+        self.note_state_change()
+        self._publish_transaction('transaction', transaction, ['transactions'])
         return True
 
+    def add_transactions(self, transactions):
+        """Add a batch of transactions to the mempool in one step"""
+        with self.lock:
+            self.unconfirmed_transactions.extend(transactions)
+            self.transaction_pool.extend(transactions)
+        for transaction in transactions:
+            self._record_admitted(transaction)
+        self.note_state_change()
+        for transaction in transactions:
+            self._publish_transaction('transaction', transaction, ['transactions'])
+        return True
+
+    def verify_signature(self, transaction):
+        """Check a client-signed transaction against its sender's public key
+
+        Until a transaction revealing an address's public key is mined,
+        each signed transaction from it must carry the key; _append_block
+        registers it from the block. Later ones are verified against the
+        registry, and a key they repeat is dropped so each key is stored
+        on chain once. Raises ValueError if verification fails.
+        """
+        scheme = get_scheme(transaction.get('signature_algorithm'))
+        public_key, revealed = self.pubkeys.resolve(transaction)
+        try:
+            signature = base64.b64decode(transaction['signature'], validate=True)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Invalid signature encoding")
+        if not scheme.verify(signature, transaction_signing_bytes(transaction), public_key):
+            raise ValueError("Invalid signature")
+        
+        if not revealed:
+            transaction.pop('public_key', None)
+
+    def verify_witnesses(self, block):
+        """Check each signed transaction in an imported block against its witness
+
+        Blocks below witness_checkpoint may come from a pruning node with
+        only a witness commitment; above it every witness must be present
+        and verify. Keys are resolved from the registry or the block's
+        own witnesses. Raises ValueError.
+        """
+        if block.witnesses is None:
+            if block.index >= self.witness_checkpoint:
+                raise ValueError(f"Block {block.index} has no witnesses and is above the trusted checkpoint")
+            return
+        
+        signed = {transaction['txid']: transaction for transaction in block.transactions if is_signed(transaction)}
+        if not block.witnesses.keys() <= signed.keys():
+            raise ValueError(f"Block {block.index} has witnesses for unknown transactions")
+        
+        revealed = {}  # sender -> public key revealed earlier in this block
+        for txid, transaction in signed.items():
+            witness = block.witnesses.get(txid)
+            if not witness:
+                raise ValueError(f"Block {block.index} is missing the witness for {txid}")
+            full = {**transaction, **witness}
+            if 'public_key' not in full and transaction.get('sender') in revealed:
+                full['public_key'] = revealed[transaction['sender']]
+            try:
+                scheme = get_scheme(transaction.get('signature_algorithm'))
+                public_key, _ = self.pubkeys.resolve(full)
+                signature = base64.b64decode(witness.get('signature') or '', validate=True)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Block {block.index} transaction {txid}: {e}")
+            payload = {k: transaction[k] for k in SIGNED_TRANSFER_FIELDS if k in transaction}
+            if not scheme.verify(signature, transaction_signing_bytes(payload), public_key):
+                raise ValueError(f"Block {block.index} has an invalid signature for {txid}")
+            if 'public_key' in witness:
+                revealed[transaction['sender']] = witness['public_key']
+
+    def _record_admitted(self, transaction):
+        """Update revenue, chart and message indexes for a new transaction"""
+        self.revenue_ledger.record_transaction(transaction)
+        if transaction.get('type') == 'message' and transaction.get('recipient'):
+            self.messages.record(transaction)
+        self.payments.observe(transaction)
+        timestamp = transaction.get('timestamp') or time.time()
+        self.rollups.record('transactions', 1, timestamp)
+        if transaction.get('amount'):
+            self.rollups.record('volume', transaction['amount'], timestamp)
+
+    def _publish_transaction(self, event, transaction, topics):
+        """Send a transaction summary to its topics and the addresses it touches"""
+        if not self.events.topics:
+            return
+        topics = list(topics)
+        for key in ('sender', 'recipient'):
+            if transaction.get(key):
+                topics.append(f"address:{transaction[key]}")
+        if transaction.get('token_address'):
+            topics.append(f"token:{transaction['token_address']}")
+        
+        # Recipient lists and payout maps can be large; events carry scalars only
+        summary = {
+            key: value for key, value in transaction.items()
+            if not isinstance(value, (list, dict))
+        }
+        for topic in topics:
+            self.events.publish(topic, event, {'transaction': summary})
+
+    def note_state_change(self):
+        """Mark off-chain state (e.g. wallets) as changed for cached readers"""
+        with self.lock:
+            self.mempool_seq += 1
+
+    def ledger_version(self):
+        """Version that changes whenever a block is added or the mempool grows"""
+        return (len(self.chain), self.mempool_seq)
+
     def mine(self):
-        if not self.unconfirmed_transactions:
+        # Only one miner at a time may claim the pending transactions
+        with self.mining_lock:
+            return self._mine_pending()
+
+    def _mine_pending(self):
+        with self.lock:
+            pending = list(self.unconfirmed_transactions)
+        if not pending:
             return False
         
+        # One aggregated fee payout per block
+        timestamp = time.time()
+        payout = self.fee_manager.create_block_fee_payout(pending, timestamp)
+        
+        # Signatures move to the witness section so proof of work hashes lean bodies
+        transactions, witnesses = split_witnesses(pending + [payout] if payout else pending)
+        
         last_block = self.last_block
         new_block = QuantumBlock(
             index=last_block.index + 1,
-            transactions=self.unconfirmed_transactions,
-            timestamp=time.time(),
-            previous_hash=last_block.hash
+            transactions=transactions,
+            timestamp=timestamp,
+            previous_hash=last_block.hash,
+            witnesses=witnesses
         )
         
         # Proof of Work
@@ -129,32 +415,249 @@ class QuantumBlockchain:
         new_block.hash = proof
         
         # Add quantum signature to block
-        block_data = json.dumps(new_block.__dict__, sort_keys=True).encode()
         new_block.quantum_signature = "DILITHIUM_SIGNATURE_" + proof[:32]
         
-        self.chain.append(new_block)
-        self.unconfirmed_transactions = []
+        # Keep transactions admitted while mining for the next block
+        with self.lock:
+            self._append_block(new_block)
+            self.unconfirmed_transactions = self.unconfirmed_transactions[len(pending):]
+        
+        # Balances are read once the mined transactions have left the mempool
+        self._publish_block(new_block)
+        return new_block.index
+
+    def _append_block(self, block):
+        """Append a validated block and update the indexes built from it"""
+        self.chain.append(block)
+        self.headers.append(self.block_header(block))
+        self.rollups.record('blocks', 1, block.timestamp)
         
         # Update mining stats
-        fees = sum(self.calculate_fee(tx['amount']) for tx in new_block.transactions if 'amount' in tx)
         self.mining_stats['total_mined'] += 50
-        self.mining_stats['total_fees'] += fees
+        for transaction in block.transactions:
+            if 'txid' in transaction:
+                self.txids.add(transaction['txid'])
+            revealed = attach_witness(transaction, block.witnesses).get('public_key')
+            if revealed:
+                # Keys are registered once the transaction revealing them is on chain
+                try:
+                    self.pubkeys.register(transaction['sender'], base64.b64decode(revealed),
+                                          transaction.get('signature_algorithm', DEFAULT_SCHEME))
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"Ignoring public key in block {block.index}: {e}")
+            self.payments.observe(transaction, confirmed=True, block_index=block.index)
+            if transaction.get('type') == 'fee_payout':
+                self.mining_stats['total_fees'] += transaction['developer_fees'] + transaction['network_fees']
+                self.fee_totals['developer_fees'] += transaction['developer_fees']
+                self.fee_totals['network_fees'] += transaction['network_fees']
+                self.fee_totals['payouts'] += 1
         
-        return new_block.index
+        # Pruning nodes drop witnesses once a block is deep enough
+        if self.witness_keep_blocks and block.index > self.witness_keep_blocks:
+            self.chain[block.index - self.witness_keep_blocks].witnesses = None
 
-    def calculate_fee(self, amount):
-        return max(amount * 0.002, 0.01)
+    def prune_witnesses(self, keep_blocks):
+        """Drop the witnesses of all but the newest keep_blocks blocks
+
+        Blocks keep their witness commitment, so their hashes still
+        verify. Returns how many blocks had witnesses removed.
+        """
+        pruned = 0
+        with self.lock:
+            for block in self.chain[:max(len(self.chain) - keep_blocks, 0)]:
+                if block.witnesses:
+                    pruned += 1
+                block.witnesses = None
+        return pruned
+
+    def _publish_block(self, block):
+        """Announce a block, its transactions and the balances it changed
+
+        Called without self.lock, once the block's transactions have left
+        the mempool, so balances count them once and slow subscribers do
+        not hold up the chain.
+        """
+        if not self.events.topics:
+            return
+        self.events.publish('blocks', 'block', {'block': self.block_header(block)})
+        
+        touched = set()
+        for transaction in block.transactions:
+            self._publish_transaction('confirmed', transaction, [])
+            touched.update(
+                transaction.get(key) for key in ('sender', 'recipient') if transaction.get(key)
+            )
+            touched.update(transaction.get('payouts', ()))
+        
+        # Balances are only worked out for addresses someone is watching
+        watched = [a for a in touched if self.events.has_subscribers(f"address:{a}")]
+        if watched:
+            for address, balance in self.get_balances(watched).items():
+                self.events.publish(f"address:{address}", 'balance',
+                                    {'address': address, 'balance': balance, 'block': block.index})
+
+    def block_to_dict(self, block, witnesses=True):
+        """Serializable form of a block, as used by chain export"""
+        data = {
+            'index': block.index,
+            'timestamp': block.timestamp,
+            'previous_hash': block.previous_hash,
+            'nonce': block.nonce,
+            'transactions': block.transactions,
+            'hash': getattr(block, 'hash', ''),
+            'quantum_signature': getattr(block, 'quantum_signature', None)
+        }
+        if block.witness_commitment:
+            data['witness_commitment'] = block.witness_commitment
+            if witnesses and block.witnesses:
+                data['witnesses'] = block.witnesses
+        return data
+
+    def iter_blocks(self, start=0, end=None):
+        """Yield blocks one at a time without copying the chain"""
+        end = len(self.chain) if end is None else min(end, len(self.chain))
+        for index in range(max(start, 0), end):
+            yield self.chain[index]
+
+    def import_block(self, data):
+        """Validate an exported block and append it to the chain
+
+        Returns True if the block was appended, False if an identical
+        block is already present. Raises ValueError for invalid blocks.
+        """
+        try:
+            block = QuantumBlock(
+                index=int(data['index']),
+                transactions=list(data['transactions']),
+                timestamp=data['timestamp'],
+                previous_hash=data['previous_hash'],
+                nonce=int(data['nonce']),
+                witnesses=dict(data.get('witnesses') or {})
+            )
+            claimed_hash = data['hash']
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed block: {e}")
+        self._check_block_shape(block)
+        self._check_fee_payout(block)
+        
+        # A block exported by a pruning node has a commitment but no witnesses
+        claimed_commitment = data.get('witness_commitment')
+        if not block.witnesses and claimed_commitment:
+            block.witness_commitment = claimed_commitment
+            block.witnesses = None
+        elif block.witness_commitment != claimed_commitment:
+            raise ValueError(f"Block {block.index} witness commitment mismatch")
+        for transaction in block.transactions:
+            if is_signed(transaction) and transaction.get('txid') != transaction_id(transaction):
+                raise ValueError(f"Block {block.index} has a transaction with a bad txid")
+        
+        # Hash is computed before the quantum signature is attached
+        if block.compute_hash() != claimed_hash:
+            raise ValueError(f"Block {block.index} hash mismatch")
+        block.hash = claimed_hash
+        block.quantum_signature = data.get('quantum_signature')
+        
+        # The miner reads last_block outside self.lock, so imports wait for it
+        with self.mining_lock, self.lock:
+            if block.index < len(self.chain):
+                if self.chain[block.index].hash == claimed_hash:
+                    return False
+                # A fresh node may adopt the imported genesis block
+                if block.index == 0 and len(self.chain) == 1 and not self.unconfirmed_transactions:
+                    self.chain = []
+                    self.headers = []
+                    self.chain.append(block)
+                    self.headers.append(self.block_header(block))
+                    self.mempool_seq += 1
+                    return True
+                raise ValueError(f"Block {block.index} conflicts with local chain")
+            
+            if block.index != len(self.chain):
+                raise ValueError(f"Block {block.index} is out of order (expected {len(self.chain)})")
+            if block.previous_hash != self.last_block.hash:
+                raise ValueError(f"Block {block.index} does not link to block {block.index - 1}")
+            if not claimed_hash.startswith('0000'):
+                raise ValueError(f"Block {block.index} fails proof of work")
+            # Keys revealed by earlier blocks are registered by now
+            self.verify_witnesses(block)
+            
+            self._append_block(block)
+        
+        for transaction in block.transactions:
+            self._record_admitted(transaction)
+        # The chain grew under the lock; bump again now the indexes match it
+        self.note_state_change()
+        for transaction in block.transactions:
+            self._publish_transaction('transaction', transaction, ['transactions'])
+        self._publish_block(block)
+        return True
+
+    def _check_block_shape(self, block):
+        """Reject field types _append_block would fail on part way through"""
+        for transaction in block.transactions:
+            if not isinstance(transaction, dict):
+                raise ValueError(f"Block {block.index} has a transaction that is not an object")
+            for key in ('txid', 'signature', 'sender', 'recipient'):
+                if key in transaction and not isinstance(transaction[key], str):
+                    raise ValueError(f"Block {block.index} has a transaction with a non-string {key}")
+            for key in ('amount', 'fee_paid', 'developer_fee', 'network_fee'):
+                if key in transaction and not isinstance(transaction[key], (int, float)):
+                    raise ValueError(f"Block {block.index} has a transaction with a non-numeric {key}")
+            if transaction.get('type') == 'fee_payout':
+                payouts = transaction.get('payouts')
+                fees = [transaction.get('developer_fees'), transaction.get('network_fees')]
+                if isinstance(payouts, dict):
+                    fees.extend(payouts.values())
+                if not isinstance(payouts, dict) or not all(isinstance(fee, (int, float)) for fee in fees):
+                    raise ValueError(f"Block {block.index} has a malformed fee payout")
+        if not all(isinstance(witness, dict) for witness in block.witnesses.values()):
+            raise ValueError(f"Block {block.index} has a witness that is not an object")
+
+    def _check_fee_payout(self, block):
+        """Require a block's fee payout to be the one its fees produce
+
+        A block carries at most one payout, and it must credit exactly
+        what create_block_fee_payout computes from the block's other
+        transactions; a block whose transactions carry no fees has none.
+        """
+        claimed = [transaction for transaction in block.transactions if transaction.get('type') == 'fee_payout']
+        if len(claimed) > 1:
+            raise ValueError(f"Block {block.index} has more than one fee payout")
+        claimed = claimed[0] if claimed else None
+        
+        others = [transaction for transaction in block.transactions if transaction.get('type') != 'fee_payout']
+        try:
+            expected = self.fee_manager.create_block_fee_payout(others, claimed and claimed.get('timestamp'))
+        except (OverflowError, ValueError):
+            raise ValueError(f"Block {block.index} has a transaction with invalid fees")
+        
+        if expected is None or claimed is None:
+            if expected is not claimed:
+                raise ValueError(f"Block {block.index} fee payout does not match its fees")
+            return
+        for key in ('sender', 'payouts', 'developer_fees', 'network_fees'):
+            if claimed.get(key) != expected[key]:
+                raise ValueError(f"Block {block.index} fee payout does not match its fees")
 
     @property
     def last_block(self):
         return self.chain[-1]
 
     def proof_of_work(self, block):
+        # Serialize the block once; nonce is the second sorted key, so only
+        # the digits between prefix and suffix change between attempts
         block.nonce = 0
-        computed_hash = block.compute_hash()
+        block_string = json.dumps(block.hashed_fields(), sort_keys=True)
+        split = block_string.index('"nonce": ') + len('"nonce": ')
+        prefix = block_string[:split].encode()
+        suffix = block_string[block_string.index(',', split):].encode()
+        
+        nonce = 0
+        computed_hash = hashlib.sha3_256(prefix + b'0' + suffix).hexdigest()
         while not computed_hash.startswith('0000'):
-            block.nonce += 1
-            computed_hash = block.compute_hash()
+            nonce += 1
+            computed_hash = hashlib.sha3_256(prefix + str(nonce).encode() + suffix).hexdigest()
+        block.nonce = nonce
         return computed_hash
 
     def get_balance(self, address):
@@ -164,7 +667,9 @@ class QuantumBlockchain:
         # Check all blocks for transactions
         for block in self.chain:
             for transaction in block.transactions:
-                if transaction.get('sender') == address:
+                if transaction.get('type') == 'fee_payout':
+                    balance += transaction['payouts'].get(address, 0)
+                elif transaction.get('sender') == address:
                     balance -= transaction.get('amount', 0)
                     # Also deduct fees if this is the main transaction
                     if 'fee_paid' in transaction:
@@ -183,6 +688,38 @@ class QuantumBlockchain:
         
         return balance
 
+    def get_balances(self, addresses):
+        """Calculate balances for several addresses in a single chain scan"""
+        balances = {
+            address: self.wallets.get(address, {}).get('balance', 0)
+            for address in addresses
+        }
+        
+        def apply(transaction):
+            if transaction.get('type') == 'fee_payout':
+                for address, amount in transaction['payouts'].items():
+                    if address in balances:
+                        balances[address] += amount
+                return
+            
+            sender = transaction.get('sender')
+            recipient = transaction.get('recipient')
+            if sender in balances:
+                balances[sender] -= transaction.get('amount', 0)
+                if 'fee_paid' in transaction:
+                    balances[sender] -= transaction['fee_paid']
+            if recipient in balances and recipient != sender:
+                balances[recipient] += transaction.get('amount', 0)
+        
+        for block in self.chain:
+            for transaction in block.transactions:
+                apply(transaction)
+        
+        for transaction in self.unconfirmed_transactions:
+            apply(transaction)
+        
+        return balances
+
 # Secure Authentication Manager
 class SecureAuthManager:
     """Secure authentication manager for founder wallets"""
@@ -306,9 +843,56 @@ class SecureAuthManager:
         }
 
 # Initialize blockchain, fee manager, and auth manager
-blockchain = QuantumBlockchain()
 fee_manager = FeeManager()
+blockchain = QuantumBlockchain(fee_manager)
 auth_manager = SecureAuthManager()
+response_cache = ResponseCache()
+
+# Merchant webhooks are queued in a durable outbox and sent in the background
+webhooks = WebhookDispatcher(
+    os.getenv('WEBHOOK_OUTBOX', os.path.join(app.root_path, 'webhook_outbox.db')),
+    secret=os.getenv('WEBHOOK_SECRET')
+)
+webhooks.start()
+
+def notify_payment_webhook(payment):
+    if payment.status == PaymentStatus.COMPLETED and payment.callback_url:
+        try:
+            webhooks.enqueue(payment.callback_url, {'event': 'payment.completed', 'payment': payment.to_dict()})
+        except ValueError as e:
+            print(f"Skipping webhook for payment {payment.id}: {e}")
+
+blockchain.payments.listeners.append(notify_payment_webhook)
+blockchain.payments.start_sweeper(interval=60)
+
+def cached_response(view=None, vary=None):
+    """Serve a read-only endpoint from cache until the ledger version changes
+
+    vary, if given, returns the other inputs the response depends on
+    (e.g. the date); a change in its value is treated as a new version.
+    """
+    if view is None:
+        return lambda view: cached_response(view, vary)
+    
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = blockchain.ledger_version()
+        if vary is not None:
+            version = (version, vary())
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), tuple(sorted(kwargs.items())))
+        entry = response_cache.get(key, version)
+        
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.put(key, version, response.get_data(), response.mimetype)
+        
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
 
 # Initialize system wallets on startup
 def initialize_system_wallets():
@@ -329,7 +913,7 @@ def initialize_system_wallets():
         if address and address not in blockchain.wallets:
             blockchain.wallets[address] = {
                 'balance': balance,
-                'algorithm': 'CRYSTALS-Dilithium2',
+                'algorithm': signature_scheme.algorithm,
                 'type': wallet_type,
                 'created': datetime.now().isoformat()
             }
@@ -347,9 +931,11 @@ initialize_system_wallets()
 print("===================================\n")
 
 # Token management
-tokens = {}
+tokens = {}  # Token metadata; balances live in token_ledger
+token_ledger = TokenLedger()
 token_transfers = defaultdict(int)
-name_registry = {}
+name_service = NameService()
+name_service.start_sweeper(interval=60)
 
 # Faucet management
 faucet_claims = {}
@@ -360,8 +946,9 @@ faucet_stats = {
 }
 
 # Storage service
-storage_files = {}
-storage_usage = defaultdict(lambda: {"used": 0, "files": []})
+storage_index = StorageIndex(quota_bytes=int(os.getenv('STORAGE_QUOTA_BYTES', 10 * 1024 ** 3)))
+chunk_store = ChunkStore(os.getenv('STORAGE_DIR', os.path.join(app.root_path, 'storage_data')))
+chunk_store.start_sweeper(interval=60)
 
 # Verified documents
 verified_documents = {}
@@ -578,26 +1165,146 @@ def register_founder():
 @app.route('/api/wallet/create', methods=['POST'])
 def create_wallet():
     """Create a new quantum-resistant wallet"""
-    wallet = QuantumResistantWallet()
-    wallet_info = wallet.create_new_wallet()
+    address, seed = keypair_pool.pop()
     
     # Store wallet
-    blockchain.wallets[wallet_info['address']] = {
+    blockchain.wallets[address] = {
         'balance': 1000.0,
         'created': time.time(),
-        'algorithm': wallet_info['algorithm'],
+        'algorithm': signature_scheme.algorithm,
         'quantum_resistant': True
     }
+    blockchain.note_state_change()
+    blockchain.rollups.record('new_wallets')
     
     return jsonify({
         'success': True,
-        'address': wallet_info['address'],
+        'address': address,
         'balance': 1000.0,
-        'algorithm': wallet_info['algorithm'],
-        'public_key_size': wallet_info['public_key_size'],
-        'signature_size': wallet_info['signature_size']
+        'algorithm': signature_scheme.algorithm,
+        'public_key_size': signature_scheme.public_key_bytes,
+        'signature_size': signature_scheme.signature_bytes
     })
 
+@app.route('/api/wallet/create/batch', methods=['POST'])
+def create_wallet_batch():
+    """Create many custodial wallets (admin only)
+
+    Streams one NDJSON line per wallet, then a summary line naming the
+    encrypted keystore that holds the secret keys.
+    """
+    if request.headers.get('X-Admin-Key') != os.environ.get('ADMIN_KEY', 'your-secure-admin-key'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    data = request.get_json() or {}
+    passphrase = data.get('passphrase')
+    try:
+        count = int(data.get('count', 0))
+    except (TypeError, ValueError):
+        count = 0
+    
+    if not 1 <= count <= MAX_WALLET_BATCH:
+        return jsonify({'success': False, 'error': f'count must be between 1 and {MAX_WALLET_BATCH}'}), 400
+    if not passphrase or len(passphrase) < 12:
+        return jsonify({'success': False, 'error': 'A passphrase of at least 12 characters is required'}), 400
+    
+    keystore_name = f"wallets-{int(time.time())}-{secrets.token_hex(4)}.qks"
+    
+    def generate():
+        # Opened once streaming starts, so a response that is never sent leaves no file behind
+        keystore = KeystoreWriter(os.path.join(KEYSTORE_DIR, keystore_name), passphrase, signature_scheme.algorithm)
+        created = time.time()
+        try:
+            for address, seed in wallet_generator.generate(count):
+                keystore.add(address, seed)
+                blockchain.wallets[address] = {
+                    'balance': 0.0,
+                    'created': created,
+                    'algorithm': signature_scheme.algorithm,
+                    'quantum_resistant': True
+                }
+                yield json.dumps({'address': address}) + '\n'
+        except BaseException:
+            keystore.abort()
+            raise
+        keystore.close()
+        blockchain.note_state_change()
+        blockchain.rollups.record('new_wallets', keystore.count)
+        yield json.dumps({'success': True, 'count': keystore.count, 'keystore': keystore_name}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/wallet/keystore/<name>')
+def download_keystore(name):
+    """Encrypted keystore written by a batch (admin only)"""
+    if request.headers.get('X-Admin-Key') != os.environ.get('ADMIN_KEY', 'your-secure-admin-key'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    path = os.path.join(KEYSTORE_DIR, os.path.basename(name))
+    if not name.endswith('.qks') or not os.path.isfile(path):
+        return jsonify({'success': False, 'error': 'Keystore not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+@app.route('/api/wallet/pool')
+def keypair_pool_stats():
+    """Depth and refill rate of the pre-generated keypair pool"""
+    return jsonify(keypair_pool.metrics())
+
+@app.route('/api/wallet/pubkey/<address>')
+def get_public_key(address):
+    """Public key an address revealed in its first signed transfer"""
+    entry = blockchain.pubkeys.lookup(address)
+    if entry is None:
+        return jsonify({'success': False, 'error': 'No public key registered for this address'}), 404
+    return jsonify({
+        'success': True,
+        'address': address,
+        'algorithm': entry[1],
+        'public_key': base64.b64encode(entry[0]).decode()
+    })
+
+@app.route('/api/wallet/pubkeys')
+def public_key_stats():
+    """Size and cache hit rate of the public key registry"""
+    return jsonify(blockchain.pubkeys.metrics())
+
+def signed_transfer(data, amount, payment_reference):
+    """Signature fields for a transfer the client signed itself
+
+    The signature covers sender, recipient, amount (as a float),
+    timestamp and any payment_reference. public_key is needed until a
+    transfer revealing it has been mined, and signature_algorithm when
+    it is not the node's default scheme. A signed transfer is accepted
+    once; resubmitting it is refused by add_transaction. Raises
+    ValueError if the signature does not verify.
+    """
+    algorithm = data.get('signature_algorithm') or signature_scheme.algorithm
+    if algorithm not in ACCEPTED_SIGNATURE_SCHEMES:
+        raise ValueError(f"Signature algorithm not accepted by this node: {algorithm}")
+    
+    try:
+        timestamp = float(data['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Signed transfers need a timestamp")
+    if abs(time.time() - timestamp) > SIGNED_TRANSFER_MAX_AGE:
+        raise ValueError("Signed transfer timestamp is out of range")
+    
+    signed = {
+        'sender': data.get('sender'),
+        'recipient': data.get('recipient'),
+        'amount': amount,
+        'timestamp': timestamp,
+        'signature': data['signature'],
+        'signature_algorithm': algorithm
+    }
+    if payment_reference:
+        signed['payment_reference'] = payment_reference
+    if data.get('public_key'):
+        signed['public_key'] = data['public_key']
+    
+    blockchain.verify_signature(signed)
+    return signed
+
 @app.route('/api/wallet/balance/<address>')
 def get_balance(address):
     if address in blockchain.wallets:
@@ -606,7 +1313,7 @@ def get_balance(address):
         return jsonify({
             'success': True,
             'balance': actual_balance,
-            'algorithm': blockchain.wallets[address].get('algorithm', 'CRYSTALS-Dilithium2')
+            'algorithm': blockchain.wallets[address].get('algorithm', DEFAULT_SCHEME)
         })
     return jsonify({'success': False, 'error': 'Wallet not found'})
 
@@ -616,13 +1323,25 @@ def send_transaction():
     sender = data.get('sender')
     recipient = data.get('recipient')
     amount = float(data.get('amount', 0))
+    payment_reference = data.get('payment_reference')
     
     if sender not in blockchain.wallets:
         return jsonify({'success': False, 'error': 'Sender wallet not found'})
     
+    if payment_reference is not None and (not isinstance(payment_reference, str) or len(payment_reference) > 64):
+        return jsonify({'success': False, 'error': 'Invalid payment reference'})
+    
     if amount <= 0:
         return jsonify({'success': False, 'error': 'Invalid amount'})
     
+    # Transfers may carry the sender's own Dilithium signature
+    signed = None
+    if data.get('signature'):
+        try:
+            signed = signed_transfer(data, amount, payment_reference)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)})
+    
     # Calculate fees
     fee_structure = fee_manager.calculate_transaction_fee(amount)
     total_cost = amount + fee_structure['total_fee']
@@ -648,14 +1367,18 @@ def send_transaction():
         'quantum_resistant': True,
         'signature': hashlib.sha256(f"{sender}{recipient}{amount}{timestamp}".encode()).hexdigest()
     }
+    if payment_reference:
+        transaction['payment_reference'] = payment_reference
+    if signed:
+        transaction.update(signed)
     
-    # Create fee distribution transactions
-    fee_transactions = fee_manager.create_fee_distribution_transactions(transaction, fee_structure)
+    # Fees are paid out per block from this record
+    fee_manager.record_fees(transaction, fee_structure)
     
-    # Add all transactions
-    blockchain.add_transaction(transaction)
-    for fee_tx in fee_transactions:
-        blockchain.add_transaction(fee_tx)
+    try:
+        blockchain.add_transaction(transaction)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
     
     # Update balances immediately
     blockchain.wallets[sender]['balance'] -= total_cost
@@ -663,7 +1386,7 @@ def send_transaction():
     
     return jsonify({
         'success': True,
-        'transaction_id': transaction['signature'],
+        'transaction_id': transaction.get('txid', transaction['signature']),
         'amount': amount,
         'fee': fee_structure['total_fee'],
         'total_cost': total_cost,
@@ -671,22 +1394,152 @@ def send_transaction():
         'fee_breakdown': fee_structure
     })
 
+@app.route('/api/transaction/send_batch', methods=['POST'])
+def send_transaction_batch():
+    """Send many transfers in one request, admitting accepted ones together"""
+    data = request.get_json()
+    transfers = data.get('transactions') if data else None
+
+    if not isinstance(transfers, list) or not transfers:
+        return jsonify({'success': False, 'error': 'Transactions list required'}), 400
+
+    if len(transfers) > MAX_TRANSACTION_BATCH:
+        return jsonify({'success': False, 'error': f'Too many transactions (max {MAX_TRANSACTION_BATCH})'}), 400
+
+    # Parse amounts up front so fees can be quoted in one pass
+    results = [None] * len(transfers)
+    amounts = []
+    for i, item in enumerate(transfers):
+        try:
+            amount = float(item.get('amount', 0))
+        except (AttributeError, TypeError, ValueError):
+            amount = 0
+        # NaN compares false against zero, so it needs the explicit check
+        valid = math.isfinite(amount) and amount > 0
+        amounts.append(amount if valid else 0)
+        if not valid:
+            results[i] = {'index': i, 'success': False, 'error': 'Invalid amount'}
+
+    try:
+        fees = fee_manager.calculate_transaction_fees(amounts)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    timestamp = time.time()
+
+    with blockchain.lock:
+        # Addresses are dictionary keys, so anything but a string is rejected below
+        senders = {
+            item['sender'] for item in transfers
+            if isinstance(item, dict) and isinstance(item.get('sender'), str)
+        }
+        balances = blockchain.get_balances(senders & blockchain.wallets.keys())
+        debits = defaultdict(float)
+
+        accepted = []
+        admitted = []
+        for i, item in enumerate(transfers):
+            if results[i] is not None:
+                continue
+
+            sender = item.get('sender')
+            recipient = item.get('recipient')
+            amount = amounts[i]
+
+            if not isinstance(sender, str) or sender not in blockchain.wallets:
+                results[i] = {'index': i, 'success': False, 'error': 'Sender wallet not found'}
+                continue
+
+            if not isinstance(recipient, str) or recipient not in blockchain.wallets:
+                results[i] = {'index': i, 'success': False, 'error': 'Recipient wallet not found'}
+                continue
+
+            fee_structure = {
+                'total_fee': fees['total_fee'][i],
+                'developer_fee': fees['developer_fee'][i],
+                'network_fee': fees['network_fee'][i]
+            }
+            total_cost = amount + fee_structure['total_fee']
+
+            # Check balance against everything this batch already debited
+            available = balances[sender] - debits[sender]
+            if available < total_cost:
+                results[i] = {
+                    'index': i,
+                    'success': False,
+                    'error': f'Insufficient balance. Need {total_cost} QRC, have {available} QRC'
+                }
+                continue
+            debits[sender] += total_cost
+
+            transaction = {
+                'sender': sender,
+                'recipient': recipient,
+                'amount': amount,
+                'fee': fee_structure['total_fee'],
+                'fee_paid': fee_structure['total_fee'],
+                'timestamp': timestamp,
+                'quantum_resistant': True,
+                'signature': hashlib.sha256(f"{sender}{recipient}{amount}{timestamp}{i}".encode()).hexdigest()
+            }
+
+            admitted.append(fee_manager.record_fees(transaction, fee_structure))
+            accepted.append((transaction, total_cost))
+
+            results[i] = {
+                'index': i,
+                'success': True,
+                'transaction_id': transaction['signature'],
+                'amount': amount,
+                'fee': fee_structure['total_fee'],
+                'total_cost': total_cost
+            }
+
+        # Admit all accepted transfers at once
+        blockchain.add_transactions(admitted)
+
+        # Update balances immediately
+        for transaction, total_cost in accepted:
+            blockchain.wallets[transaction['sender']]['balance'] -= total_cost
+            blockchain.wallets[transaction['recipient']]['balance'] += transaction['amount']
+
+    return jsonify({
+        'success': True,
+        'accepted': len(accepted),
+        'rejected': len(transfers) - len(accepted),
+        'results': results,
+        'quantum_signature': True
+    })
+
 @app.route('/api/quantum/security')
+@cached_response
 def quantum_security_status():
     """Get quantum security information"""
     return jsonify({
         'quantum_resistant': True,
-        'signature_algorithm': 'CRYSTALS-Dilithium2',
-        'nist_level': 2,
-        'key_sizes': {
-            'public_key': 1312,
-            'secret_key': 2528,
-            'signature': 2420
-        },
+        'signature_algorithm': signature_scheme.algorithm,
+        'nist_level': signature_scheme.nist_level,
+        'key_sizes': signature_scheme.info()['key_sizes'],
+        'accepted_algorithms': sorted(ACCEPTED_SIGNATURE_SCHEMES),
         'post_quantum': True,
         'implementation': 'Production Ready'
     })
 
+@app.route('/api/quantum/schemes')
+@cached_response
+def signature_schemes():
+    """Sizes of every signature scheme this node accepts"""
+    return jsonify({
+        'default': signature_scheme.algorithm,
+        'schemes': [
+            {
+                **SCHEMES[algorithm].info(),
+                'bytes_per_transaction': SCHEMES[algorithm].transaction_overhead(),
+                'bytes_first_transaction': SCHEMES[algorithm].transaction_overhead(reveal_public_key=True)
+            }
+            for algorithm in sorted(ACCEPTED_SIGNATURE_SCHEMES)
+        ]
+    })
+
 @app.route('/api/transaction/calculate', methods=['POST'])
 def calculate_fees():
     """Calculate fees before sending transaction"""
@@ -707,7 +1560,41 @@ def calculate_fees():
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
+@app.route('/api/transaction/calculate/batch', methods=['POST'])
+def calculate_fees_batch():
+    """Calculate fees for a list of amounts in one request"""
+    values = request.get_json()
+    amounts = values.get('amounts') if values else None
+
+    if not isinstance(amounts, list) or not amounts:
+        return jsonify({'message': 'Amounts list required'}), 400
+
+    if len(amounts) > MAX_FEE_QUOTE_BATCH:
+        return jsonify({'message': f'Too many amounts (max {MAX_FEE_QUOTE_BATCH})'}), 400
+
+    try:
+        fees = fee_manager.calculate_transaction_fees(amounts)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    total_cost = [
+        (amount_units + fee_units) / FEE_BASE_UNITS
+        for amount_units, fee_units in zip(fees['amount_units'], fees['total_fee_units'])
+    ]
+
+    return jsonify({
+        'count': len(amounts),
+        'amounts': amounts,
+        'fees': {
+            'total_fee': fees['total_fee'],
+            'developer_fee': fees['developer_fee'],
+            'network_fee': fees['network_fee']
+        },
+        'total_cost': total_cost
+    })
+
 @app.route('/api/fees/info', methods=['GET'])
+@cached_response
 def fee_info():
     """Get current fee structure"""
     return jsonify({
@@ -729,6 +1616,7 @@ def fee_info():
     })
 
 @app.route('/api/stats')
+@cached_response(vary=lambda: blockchain.tps_data['current'])
 def get_stats():
     total_wallets = len(blockchain.wallets)
     total_transactions = sum(len(block.transactions) for block in blockchain.chain)
@@ -740,10 +1628,11 @@ def get_stats():
         'total_transactions': total_transactions,
         'active_users': total_wallets,
         'quantum_resistant': True,
-        'signature_algorithm': 'CRYSTALS-Dilithium2'
+        'signature_algorithm': signature_scheme.algorithm
     })
 
 @app.route('/api/blocks/recent')
+@cached_response
 def get_recent_blocks():
     recent_blocks = []
     for block in blockchain.chain[-10:]:
@@ -756,6 +1645,132 @@ def get_recent_blocks():
         })
     return jsonify({'blocks': recent_blocks})
 
+@app.route('/api/blocks')
+@cached_response
+def get_blocks():
+    """Page through blocks newest first, as headers or full blocks"""
+    fields = request.args.get('fields', 'header')
+    if fields not in ('header', 'full'):
+        return jsonify({'success': False, 'error': 'fields must be header or full'}), 400
+    
+    max_limit = MAX_FULL_BLOCK_PAGE if fields == 'full' else MAX_HEADER_PAGE
+    headers = blockchain.headers
+    height = len(headers) - 1
+    
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_BLOCK_PAGE)), 1), max_limit)
+        lowest = max(int(request.args.get('from', 0)), 0)
+        highest = min(int(request.args.get('to', height)), height)
+        # The cursor is the next (lower) height to continue from
+        if request.args.get('cursor') is not None:
+            highest = min(int(request.args['cursor']), highest)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'from, to, limit and cursor must be integers'}), 400
+    
+    if highest < lowest:
+        return jsonify({'success': True, 'blocks': [], 'next_cursor': None, 'height': height})
+    
+    start = max(lowest, highest - limit + 1)
+    page = headers[start:highest + 1][::-1]
+    
+    if fields == 'full':
+        # Bodies are only loaded for the blocks on this page
+        page = [
+            {**header, 'transactions': blockchain.chain[header['index']].transactions}
+            for header in page
+        ]
+    
+    return jsonify({
+        'success': True,
+        'blocks': page,
+        'next_cursor': start - 1 if start > lowest else None,
+        'height': height
+    })
+
+@app.route('/api/blocks/<int:index>')
+def get_block(index):
+    """Get one full block by height, with witnesses if ?witness=1"""
+    if index < 0 or index >= len(blockchain.chain):
+        return jsonify({'success': False, 'error': 'Block not found'}), 404
+    
+    block = blockchain.chain[index]
+    result = {**blockchain.headers[index], 'transactions': block.transactions}
+    if request.args.get('witness') in ('1', 'true'):
+        result['witnesses'] = block.witnesses
+        result['witnesses_pruned'] = block.witnesses is None
+    return jsonify({'success': True, 'block': result})
+
+@app.route('/api/chain/export')
+def export_chain():
+    """Stream the chain as newline-delimited JSON, one block per line"""
+    try:
+        start = int(request.args.get('from', 0))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'from must be an integer'}), 400
+    include_witnesses = request.args.get('witnesses', '1') not in ('0', 'false')
+    
+    def generate():
+        for block in blockchain.iter_blocks(start):
+            yield json.dumps(blockchain.block_to_dict(block, include_witnesses), separators=(',', ':')) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': 'attachment; filename=qrc-chain.ndjson'
+    })
+
+@app.route('/api/chain/import', methods=['POST'])
+def import_chain():
+    """Validate and append blocks streamed as newline-delimited JSON (admin only)"""
+    if request.headers.get('X-Admin-Key') != os.environ.get('ADMIN_KEY', 'your-secure-admin-key'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    imported = 0
+    skipped = 0
+    line_number = 0
+    
+    # Read one line at a time so memory stays bounded by the largest block
+    for line in iter(request.stream.readline, b''):
+        line_number += 1
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if blockchain.import_block(json.loads(line)):
+                imported += 1
+            else:
+                skipped += 1
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'line': line_number,
+                'imported': imported,
+                'skipped': skipped,
+                'height': len(blockchain.chain) - 1
+            }), 400
+    
+    return jsonify({
+        'success': True,
+        'imported': imported,
+        'skipped': skipped,
+        'height': len(blockchain.chain) - 1
+    })
+
+@app.route('/api/chain/prune_witnesses', methods=['POST'])
+def prune_witnesses():
+    """Drop witnesses from all but the newest blocks (admin only)"""
+    if request.headers.get('X-Admin-Key') != os.environ.get('ADMIN_KEY', 'your-secure-admin-key'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        keep_blocks = int(data.get('keep_blocks', 100))
+    except (TypeError, ValueError):
+        keep_blocks = -1
+    if keep_blocks < 0:
+        return jsonify({'success': False, 'error': 'keep_blocks must be a non-negative integer'}), 400
+    
+    return jsonify({'success': True, 'pruned_blocks': blockchain.prune_witnesses(keep_blocks)})
+
 @app.route('/api/transactions/recent')
 def get_recent_transactions():
     recent_txs = blockchain.transaction_pool[-20:]
@@ -778,6 +1793,15 @@ def mining_stats():
         'mining_algorithm': 'SHA3-256 with Dilithium signatures'
     })
 
+@app.route('/api/webhooks/stats')
+def webhook_stats():
+    return jsonify(webhooks.stats())
+
+@app.route('/api/payment/stats')
+def payment_stats():
+    """Payment requests by status and the memory the watcher holds"""
+    return jsonify(blockchain.payments.stats())
+
 @app.route('/api/wallet/import', methods=['POST'])
 def import_wallet():
     """Import wallet from external provider (MetaMask, etc)"""
@@ -795,9 +1819,11 @@ def import_wallet():
         'created': time.time(),
         'external_address': external_address,
         'wallet_type': wallet_type,
-        'algorithm': 'CRYSTALS-Dilithium2',
+        'algorithm': signature_scheme.algorithm,
         'quantum_resistant': True
     }
+    blockchain.note_state_change()
+    blockchain.rollups.record('new_wallets')
     
     return jsonify({
         'success': True,
@@ -835,24 +1861,27 @@ def claim_faucet():
     faucet_claims[address] = time.time()
     
     # Update stats
+    blockchain.rollups.record('faucet_claims')
     faucet_stats["total_claimed"] += 100
     faucet_stats["unique_users"].add(address)
     faucet_stats["daily_claims"][datetime.now().strftime("%Y-%m-%d")] += 1
     
-    # Create gas fee transaction (goes to developer)
-    fee_transaction = {
+    # Record claim with its gas fee (paid out to developer with the block)
+    claim_transaction = {
         'sender': address,
-        'recipient': fee_manager.developer_address,
-        'amount': gas_fee,
+        'recipient': 'FAUCET',
+        'fee_paid': gas_fee,
+        'developer_fee': gas_fee,
+        'network_fee': 0,
         'timestamp': time.time(),
-        'type': 'faucet_gas_fee'
+        'type': 'faucet_claim'
     }
     
     # Give tokens (minus gas fee)
     blockchain.wallets[address]['balance'] += (100 - gas_fee)
     
-    # Add gas fee transaction
-    blockchain.add_transaction(fee_transaction)
+    # Add claim transaction
+    blockchain.add_transaction(claim_transaction)
     
     return jsonify({
         'success': True,
@@ -891,18 +1920,19 @@ def create_token():
         "totalSupply": int(data.get('totalSupply', 0)),
         "decimals": int(data.get('decimals', 18)),
         "creator": creator,
-        "holders": {creator: int(data.get('totalSupply', 0))},
         "created": datetime.now().isoformat(),
         "type": data.get('type', 'standard')
     }
+    token_ledger.mint(token_address, creator, tokens[token_address]["totalSupply"])
     
     # Create main transaction
     timestamp = time.time()
     transaction = {
         'sender': creator,
         'recipient': 'TOKEN_CREATION',
-        'amount': creation_fee,
-        'fee': 0,
+        'amount': 0,
+        'fee': creation_fee,
+        'fee_paid': creation_fee,
         'timestamp': timestamp,
         'type': 'token_creation',
         'token_address': token_address,
@@ -910,21 +1940,18 @@ def create_token():
         'signature': hashlib.sha256(f"create-{token_address}".encode()).hexdigest()
     }
     
-    # Create fee distribution transactions
-    fee_txs = fee_manager.create_fee_distribution_transactions(transaction, fee_structure)
+    # The creation fee is charged as fee_paid and paid out per block from this record
+    fee_manager.record_fees(transaction, fee_structure)
     
     # Update balance
     blockchain.wallets[creator]['balance'] -= creation_fee
     
-    # Add transactions
     blockchain.add_transaction(transaction)
-    for fee_tx in fee_txs:
-        blockchain.add_transaction(fee_tx)
     
     return jsonify({
         "success": True,
         "tokenAddress": token_address,
-        "token": tokens[token_address],
+        "token": {**tokens[token_address], "holderCount": token_ledger.holder_count(token_address)},
         "transactionHash": transaction['signature'],
         "fee_paid": creation_fee
     })
@@ -934,7 +1961,51 @@ def get_token_info(token_address):
     if token_address not in tokens:
         return jsonify({"error": "Token not found"}), 404
     
-    return jsonify(tokens[token_address])
+    return jsonify({
+        **tokens[token_address],
+        "holderCount": token_ledger.holder_count(token_address)
+    })
+
+@app.route('/api/token/<token_address>/holders', methods=['GET'])
+def get_token_holders(token_address):
+    """Page through a token's holders, largest balance first"""
+    if token_address not in tokens:
+        return jsonify({"error": "Token not found"}), 404
+    
+    try:
+        cursor = max(int(request.args.get('cursor', 0)), 0)
+        limit = min(max(int(request.args.get('limit', DEFAULT_HOLDER_PAGE)), 1), MAX_HOLDER_PAGE)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    
+    holders = token_ledger.top_holders(token_address, cursor, limit)
+    total = token_ledger.holder_count(token_address)
+    next_cursor = cursor + len(holders)
+    
+    return jsonify({
+        "token": token_address,
+        "holderCount": total,
+        "holders": [{"address": holder, "balance": balance} for holder, balance in holders],
+        "next_cursor": next_cursor if next_cursor < total else None
+    })
+
+@app.route('/api/token/holdings/<address>', methods=['GET'])
+def get_token_holdings(address):
+    """Tokens held by an address"""
+    holdings = []
+    for token_address, balance in token_ledger.tokens_of(address):
+        token = tokens.get(token_address, {})
+        holdings.append({
+            "tokenAddress": token_address,
+            "name": token.get("name"),
+            "symbol": token.get("symbol"),
+            "balance": balance
+        })
+    
+    return jsonify({
+        "address": address,
+        "holdings": holdings
+    })
 
 @app.route('/api/token/transfer', methods=['POST'])
 @limiter.limit("30 per minute")
@@ -945,36 +2016,44 @@ def transfer_token():
     to_address = data.get('to')
     amount = int(data.get('amount', 0))
     
-    if token_address not in tokens:
+    if not isinstance(token_address, str) or token_address not in tokens:
         return jsonify({"error": "Token not found"}), 404
     
-    token = tokens[token_address]
+    if not isinstance(from_address, str):
+        return jsonify({"error": "Invalid sender address"}), 400
+    
+    # The ledger keys balances by address, so the recipient must be a non-empty string
+    if not isinstance(to_address, str) or not to_address or amount <= 0:
+        return jsonify({"error": "Invalid recipient or amount"}), 400
     
-    if from_address not in token['holders'] or token['holders'][from_address] < amount:
+    if token_ledger.balance_of(token_address, from_address) < amount:
         return jsonify({"error": "Insufficient token balance"}), 400
     
     # Token transfer gas fee
-    gas_fee = 0.1  # Fixed gas fee for token transfers
+    gas_fee = TOKEN_TRANSFER_GAS
     
     if blockchain.get_balance(from_address) < gas_fee:
         return jsonify({"error": f"Insufficient QRC for gas fee ({gas_fee} QRC)"}), 400
     
     # Transfer tokens
-    token['holders'][from_address] -= amount
-    if to_address not in token['holders']:
-        token['holders'][to_address] = 0
-    token['holders'][to_address] += amount
+    try:
+        token_ledger.transfer(token_address, from_address, to_address, amount)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Track transfers
     token_transfers[token_address] += 1
     
-    # Create gas fee transaction (all goes to developer for token operations)
-    fee_transaction = {
+    # Record transfer with its gas fee (all goes to developer for token operations)
+    transfer_transaction = {
         'sender': from_address,
-        'recipient': fee_manager.developer_address,
-        'amount': gas_fee,
+        'recipient': to_address,
+        'token_amount': amount,
+        'fee_paid': gas_fee,
+        'developer_fee': gas_fee,
+        'network_fee': 0,
         'timestamp': time.time(),
-        'type': 'token_transfer_gas',
+        'type': 'token_transfer',
         'token_address': token_address
     }
     
@@ -982,7 +2061,7 @@ def transfer_token():
     blockchain.wallets[from_address]['balance'] -= gas_fee
     
     # Add transaction
-    blockchain.add_transaction(fee_transaction)
+    blockchain.add_transaction(transfer_transaction)
     
     return jsonify({
         "success": True,
@@ -993,6 +2072,82 @@ def transfer_token():
         "token": token_address
     })
 
+@app.route('/api/token/multi-transfer', methods=['POST'])
+@limiter.limit("10 per minute")
+def multi_transfer_token():
+    """Send a token to many recipients in one atomic update"""
+    data = request.get_json()
+    token_address = data.get('tokenAddress')
+    from_address = data.get('from')
+    recipients = data.get('recipients')
+    
+    if not isinstance(token_address, str) or token_address not in tokens:
+        return jsonify({"error": "Token not found"}), 404
+    
+    if not isinstance(from_address, str):
+        return jsonify({"error": "Invalid sender address"}), 400
+    
+    if not isinstance(recipients, list) or not recipients:
+        return jsonify({"error": "Recipients list required"}), 400
+    
+    if len(recipients) > MAX_MULTI_TRANSFER_RECIPIENTS:
+        return jsonify({"error": f"Too many recipients (max {MAX_MULTI_TRANSFER_RECIPIENTS})"}), 400
+    
+    try:
+        transfers = [(item['to'], int(item['amount'])) for item in recipients]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Each recipient needs 'to' and an integer 'amount'"}), 400
+    
+    # The ledger keys balances by address, so each one must be a non-empty string
+    if not all(isinstance(to_address, str) and to_address for to_address, _ in transfers):
+        return jsonify({"error": "Invalid recipient address"}), 400
+    
+    # One aggregated gas fee for the whole operation
+    gas_fee = round(TOKEN_TRANSFER_GAS + TOKEN_MULTI_TRANSFER_GAS_PER_RECIPIENT * len(transfers), 8)
+    
+    if blockchain.get_balance(from_address) < gas_fee:
+        return jsonify({"error": f"Insufficient QRC for gas fee ({gas_fee} QRC)"}), 400
+    
+    try:
+        total = token_ledger.multi_transfer(token_address, from_address, transfers)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    token_transfers[token_address] += len(transfers)
+    
+    # One compact record committing to the full recipient list
+    transfers_hash = hashlib.sha3_256(
+        json.dumps(transfers, separators=(',', ':')).encode()
+    ).hexdigest()
+    transfer_transaction = {
+        'sender': from_address,
+        'recipient': 'TOKEN_MULTI_TRANSFER',
+        'token_amount': total,
+        'recipient_count': len(transfers),
+        'transfers_hash': transfers_hash,
+        'fee_paid': gas_fee,
+        'developer_fee': gas_fee,
+        'network_fee': 0,
+        'timestamp': time.time(),
+        'type': 'token_multi_transfer',
+        'token_address': token_address
+    }
+    
+    # Update balance
+    blockchain.wallets[from_address]['balance'] -= gas_fee
+    
+    blockchain.add_transaction(transfer_transaction)
+    
+    return jsonify({
+        "success": True,
+        "from": from_address,
+        "recipients": len(transfers),
+        "total_amount": total,
+        "gas_fee": gas_fee,
+        "transfers_hash": transfers_hash,
+        "token": token_address
+    })
+
 # Name Service (ENS-like)
 @app.route('/api/name/register', methods=['POST'])
 @limiter.limit("5 per hour")
@@ -1005,7 +2160,7 @@ def register_name():
     if not name or len(name) < 3:
         return jsonify({"error": "Name must be at least 3 characters"}), 400
     
-    if name in name_registry:
+    if not name_service.is_available(name):
         return jsonify({"error": "Name already taken"}), 400
     
     if not owner or owner not in blockchain.wallets:
@@ -1028,19 +2183,19 @@ def register_name():
         return jsonify({"error": f"Insufficient balance. Need {total_price} QRC"}), 400
     
     # Register name
-    name_registry[name] = {
-        "owner": owner,
-        "registered": datetime.now().isoformat(),
-        "expires": datetime.now().replace(year=datetime.now().year + years).isoformat()
-    }
+    timestamp = time.time()
+    try:
+        record = name_service.register(name, owner, years, now=timestamp)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Create transaction
-    timestamp = time.time()
     transaction = {
         'sender': owner,
         'recipient': 'NAME_SERVICE',
-        'amount': total_price,
-        'fee': 0,
+        'amount': 0,
+        'fee': total_price,
+        'fee_paid': total_price,
         'timestamp': timestamp,
         'type': 'name_registration',
         'name': f"{name}.qrc",
@@ -1048,46 +2203,34 @@ def register_name():
         'signature': hashlib.sha256(f"register-{name}".encode()).hexdigest()
     }
     
-    # Create custom fee structure for name registration
-    custom_fee_structure = {
-        "total_fee": total_price,
-        "developer_fee": total_price,  # All goes to developer for features
-        "network_fee": 0,
-        "fee_transactions": [
-            {
-                "recipient": fee_manager.developer_address,
-                "amount": total_price,
-                "type": "name_registration_fee"
-            }
-        ]
-    }
-    
-    # Create fee transactions
-    fee_txs = fee_manager.create_fee_distribution_transactions(transaction, custom_fee_structure)
+    # Charged as fee_paid; all goes to developer for features
+    fee_manager.record_fees(transaction, {
+        "developer_fee": total_price,
+        "network_fee": 0
+    })
     
     # Update balance
     blockchain.wallets[owner]['balance'] -= total_price
     
-    # Add transactions
     blockchain.add_transaction(transaction)
-    for fee_tx in fee_txs:
-        blockchain.add_transaction(fee_tx)
     
     return jsonify({
         "success": True,
         "name": f"{name}.qrc",
         "transactionHash": transaction['signature'],
-        "fee_paid": total_price
+        "fee_paid": total_price,
+        "expires": record.to_dict()['expires']
     })
 
 @app.route('/api/name/<name>', methods=['GET'])
 def check_name(name):
     name = name.lower()
-    if name in name_registry:
+    record = name_service.lookup(name)
+    if record is not None:
         return jsonify({
             "available": False,
-            "owner": name_registry[name]['owner'],
-            "expires": name_registry[name]['expires']
+            "owner": record.owner,
+            "expires": record.to_dict()['expires']
         })
     
     # Calculate price using fee manager base
@@ -1106,50 +2249,66 @@ def check_name(name):
         "price": price
     })
 
-# Storage Service
-@app.route('/api/storage/upload', methods=['POST'])
-@limiter.limit("50 per hour")
-def upload_file():
-    data = request.get_json()
-    owner = data.get('owner')
-    file_hash = data.get('hash')
-    file_size = int(data.get('size', 0))  # in bytes
-    file_name = data.get('name')
+@app.route('/api/name/search', methods=['GET'])
+def search_names():
+    """Registered names starting with a prefix, in alphabetical order"""
+    prefix = request.args.get('prefix', '').lower()
+    after = request.args.get('cursor', '').lower() or None
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_NAME_SEARCH)), 1), MAX_NAME_SEARCH)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
     
-    if not owner or owner not in blockchain.wallets:
-        return jsonify({"error": "Invalid owner"}), 400
+    if not prefix:
+        return jsonify({"error": "prefix is required"}), 400
     
-    # Calculate fees using fee manager
+    records = name_service.search(prefix, limit, after=after)
+    
+    return jsonify({
+        "prefix": prefix,
+        "available": len(prefix) >= 3 and name_service.is_available(prefix),
+        "names": [record.to_dict() for record in records],
+        "next_cursor": records[-1].name if len(records) == limit else None
+    })
+
+@app.route('/api/name/owner/<address>', methods=['GET'])
+def names_by_owner(address):
+    return jsonify({
+        "owner": address,
+        "names": [record.to_dict() for record in name_service.names_of(address)]
+    })
+
+# Storage Service
+def storage_fees(file_size):
+    """(monthly storage fee, total due now) for a file of file_size bytes"""
     size_mb = file_size / (1024 ** 2)  # Convert to MB
     storage_fee_structure = fee_manager.calculate_feature_fee("storage", size_mb=size_mb)
     storage_fee = storage_fee_structure['total_fee']
     
     upload_fee = 0.001  # Fixed upload fee
-    total_fee = upload_fee + storage_fee
-    
-    if blockchain.get_balance(owner) < total_fee:
-        return jsonify({"error": f"Insufficient balance. Need {total_fee} QRC"}), 400
-    
-    # Store file metadata
-    storage_files[file_hash] = {
-        "owner": owner,
-        "name": file_name,
-        "size": file_size,
-        "uploaded": datetime.now().isoformat(),
-        "monthly_fee": storage_fee
-    }
-    
-    # Update user storage
-    storage_usage[owner]["used"] += file_size
-    storage_usage[owner]["files"].append(file_hash)
+    return storage_fee, upload_fee + storage_fee
+
+def download_name(name):
+    """A stored file's name without the control characters a header cannot carry"""
+    return ''.join(ch for ch in name if ch.isprintable()) or 'download'
+
+def record_stored_file(owner, file_hash, file_size, file_name, storage_fee, total_fee, holds_chunks=False):
+    """Save file metadata and charge the owner for it
+
+    Raises ValueError, before charging, if the owner already holds the
+    file or it does not fit in their quota.
+    """
+    timestamp = time.time()
+    storage_index.add(owner, file_hash, file_name, file_size, storage_fee,
+                      uploaded=timestamp, holds_chunks=holds_chunks)
     
     # Create transaction
-    timestamp = time.time()
     transaction = {
         'sender': owner,
         'recipient': 'STORAGE_SERVICE',
-        'amount': total_fee,
-        'fee': 0,
+        'amount': 0,
+        'fee': total_fee,
+        'fee_paid': total_fee,
         'timestamp': timestamp,
         'type': 'file_upload',
         'file_hash': file_hash,
@@ -1157,30 +2316,50 @@ def upload_file():
         'signature': hashlib.sha256(f"upload-{file_hash}".encode()).hexdigest()
     }
     
-    # All storage fees go to developer
-    custom_fee_structure = {
-        "total_fee": total_fee,
+    # Charged as fee_paid; all storage fees go to developer
+    fee_manager.record_fees(transaction, {
         "developer_fee": total_fee,
-        "network_fee": 0,
-        "fee_transactions": [
-            {
-                "recipient": fee_manager.developer_address,
-                "amount": total_fee,
-                "type": "storage_fee"
-            }
-        ]
-    }
-    
-    # Create fee transactions
-    fee_txs = fee_manager.create_fee_distribution_transactions(transaction, custom_fee_structure)
+        "network_fee": 0
+    })
     
     # Update balance
     blockchain.wallets[owner]['balance'] -= total_fee
     
-    # Add transactions
     blockchain.add_transaction(transaction)
-    for fee_tx in fee_txs:
-        blockchain.add_transaction(fee_tx)
+
+@app.route('/api/storage/upload', methods=['POST'])
+@limiter.limit("50 per hour")
+def upload_file():
+    data = request.get_json()
+    owner = data.get('owner')
+    file_hash = data.get('hash')
+    file_name = data.get('name')
+    try:
+        file_size = int(data.get('size', 0))  # in bytes
+    except (TypeError, ValueError):
+        return jsonify({"error": "size (bytes) must be an integer"}), 400
+    
+    if not owner or owner not in blockchain.wallets:
+        return jsonify({"error": "Invalid owner"}), 400
+    if file_size < 0:
+        return jsonify({"error": "size must not be negative"}), 400
+    
+    if storage_index.get(owner, file_hash) is not None:
+        return jsonify({"error": "File already stored"}), 400
+    
+    if not storage_index.has_room(owner, file_size):
+        return jsonify({"error": "Storage quota exceeded"}), 400
+    
+    # Calculate fees using fee manager
+    storage_fee, total_fee = storage_fees(file_size)
+    
+    if blockchain.get_balance(owner) < total_fee:
+        return jsonify({"error": f"Insufficient balance. Need {total_fee} QRC"}), 400
+    
+    try:
+        record_stored_file(owner, file_hash, file_size, file_name, storage_fee, total_fee)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify({
         "success": True,
@@ -1189,16 +2368,210 @@ def upload_file():
         "totalFeePaid": total_fee
     })
 
+@app.route('/api/storage/upload/start', methods=['POST'])
+@limiter.limit("50 per hour")
+def start_upload():
+    """Open a resumable upload; bytes are then sent with PUT"""
+    data = request.get_json() or {}
+    owner = data.get('owner')
+    file_name = data.get('name')
+    try:
+        file_size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "size (bytes) is required"}), 400
+    
+    if not owner or owner not in blockchain.wallets:
+        return jsonify({"error": "Invalid owner"}), 400
+    if file_size < 0:
+        return jsonify({"error": "size must not be negative"}), 400
+    
+    if not storage_index.has_room(owner, file_size):
+        return jsonify({"error": "Storage quota exceeded"}), 400
+    
+    storage_fee, total_fee = storage_fees(file_size)
+    if blockchain.get_balance(owner) < total_fee:
+        return jsonify({"error": f"Insufficient balance. Need {total_fee} QRC"}), 400
+    
+    session = chunk_store.begin_upload(file_size, {"owner": owner, "name": file_name})
+    return jsonify({
+        "uploadId": session.id,
+        "received": 0,
+        "size": file_size,
+        "chunkSize": chunk_store.chunk_size
+    })
+
+@app.route('/api/storage/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Bytes received so far, used to resume an interrupted upload"""
+    session = chunk_store.get_upload(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    return jsonify({
+        "uploadId": upload_id,
+        "received": session.received,
+        "size": session.expected_size
+    })
+
+@app.route('/api/storage/upload/<upload_id>', methods=['PUT'])
+@limiter.exempt
+def upload_bytes(upload_id):
+    """Append the raw request body at ?offset= (defaults to 0)"""
+    try:
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "offset must be an integer"}), 400
+    
+    try:
+        received = chunk_store.write(upload_id, request.stream, offset)
+    except KeyError:
+        return jsonify({"error": "Upload not found"}), 404
+    except ValueError as e:
+        session = chunk_store.get_upload(upload_id)
+        return jsonify({"error": str(e), "received": session.received if session else None}), 409
+    
+    return jsonify({"uploadId": upload_id, "received": received})
+
+@app.route('/api/storage/upload/<upload_id>/complete', methods=['POST'])
+@limiter.limit("50 per hour")
+def complete_upload(upload_id):
+    session = chunk_store.get_upload(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    owner = session.meta['owner']
+    file_name = session.meta['name']
+    
+    try:
+        file_hash, file_size = chunk_store.finish_upload(upload_id)
+    except KeyError:
+        return jsonify({"error": "Upload not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    
+    # The same owner uploading the same content again is not charged twice
+    existing = storage_index.get(owner, file_hash)
+    if existing is not None:
+        # A record registered by hash only takes over this upload's reference
+        if not storage_index.claim_chunks(owner, file_hash):
+            chunk_store.release(file_hash)
+        return jsonify({
+            "success": True,
+            "fileHash": file_hash,
+            "duplicate": True,
+            "monthlyFee": existing.monthly_fee,
+            "totalFeePaid": 0
+        })
+    
+    if not storage_index.has_room(owner, file_size):
+        chunk_store.release(file_hash)
+        return jsonify({"error": "Storage quota exceeded"}), 400
+    
+    storage_fee, total_fee = storage_fees(file_size)
+    if blockchain.get_balance(owner) < total_fee:
+        chunk_store.release(file_hash)
+        return jsonify({"error": f"Insufficient balance. Need {total_fee} QRC"}), 400
+    
+    try:
+        record_stored_file(owner, file_hash, file_size, file_name, storage_fee, total_fee, holds_chunks=True)
+    except ValueError as e:
+        chunk_store.release(file_hash)
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "success": True,
+        "fileHash": file_hash,
+        "size": file_size,
+        "monthlyFee": storage_fee,
+        "totalFeePaid": total_fee
+    })
+
+@app.route('/api/storage/file/<file_hash>', methods=['GET'])
+def download_file(file_hash):
+    """Stored file contents; supports single byte-range requests"""
+    info = chunk_store.file_info(file_hash)
+    if info is None:
+        return jsonify({"error": "File not found"}), 404
+    size, chunks = info
+    
+    found = storage_index.find(file_hash)
+    file_name = download_name((found[1].name if found else None) or file_hash)
+    mimetype = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    
+    # A single-chunk file is the chunk itself, so the server can sendfile it
+    if len(chunks) == 1:
+        try:
+            return send_file(chunk_store.chunk_path(chunks[0]), mimetype=mimetype,
+                             download_name=file_name, conditional=True, etag=file_hash)
+        except FileNotFoundError:
+            # Released between the lookup and the open
+            return jsonify({"error": "File not found"}), 404
+    
+    start, end, status = 0, size, 200
+    if request.range is not None:
+        byte_range = request.range.range_for_length(size)
+        if request.range.units != 'bytes' or byte_range is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f"bytes */{size}"
+            return response
+        start, end = byte_range
+        status = 206
+    
+    response = Response(chunk_store.iter_range(file_hash, start, end), status=status,
+                        mimetype=mimetype, direct_passthrough=True)
+    response.content_length = end - start
+    response.headers['Accept-Ranges'] = 'bytes'
+    if file_name.isascii():
+        response.headers.set('Content-Disposition', 'attachment', filename=file_name)
+    else:
+        # Same form send_file uses: an ASCII fallback plus the RFC 5987 UTF-8 name
+        response.headers.set('Content-Disposition', 'attachment',
+                             filename=file_name.encode('ascii', 'ignore').decode('ascii'),
+                             **{'filename*': "UTF-8''" + url_quote(file_name, safe="!#$&+-.^_`|~")})
+    response.set_etag(file_hash)
+    if status == 206:
+        response.headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+    return response
+
 @app.route('/api/storage/<address>', methods=['GET'])
 def get_storage_info(address):
-    usage = storage_usage.get(address, {"used": 0, "files": []})
-    files = [storage_files[h] for h in usage["files"] if h in storage_files]
+    """Storage totals for an address and one page of its files"""
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = min(max(int(request.args.get('limit', DEFAULT_STORAGE_PAGE)), 1), MAX_STORAGE_PAGE)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    
+    usage = storage_index.usage(address)
+    files, next_cursor = storage_index.list_files(address, cursor, limit)
+    
+    return jsonify({
+        "usedBytes": usage["used"],
+        "fileCount": usage["files"],
+        "monthlyFee": usage["monthly_fee"],
+        "quotaBytes": storage_index.quota_bytes,
+        "files": [record.to_dict(address) for record in files],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/storage/<address>/<file_hash>', methods=['DELETE'])
+@limiter.limit("50 per hour")
+def delete_file(address, file_hash):
+    """Stop storing a file; its bytes are freed once no owner holds them"""
+    try:
+        record = storage_index.remove(address, file_hash)
+    except KeyError:
+        return jsonify({"error": "File not found"}), 404
+    
+    # Only a record that took a chunk-store reference gives one back
+    if record.holds_chunks:
+        chunk_store.release(file_hash)
     
+    usage = storage_index.usage(address)
     return jsonify({
+        "success": True,
+        "fileHash": file_hash,
+        "freedBytes": record.size,
         "usedBytes": usage["used"],
-        "fileCount": len(files),
-        "monthlyFee": sum(f["monthly_fee"] for f in files),
-        "files": files
+        "monthlyFee": usage["monthly_fee"]
     })
 
 # Message Service
@@ -1208,12 +2581,20 @@ def send_message():
     data = request.get_json()
     from_address = data.get('from')
     to_address = data.get('to')
-    message = data.get('message', '')[:280]  # Twitter-like limit
+    message = data.get('message', '')
     encrypted = data.get('encrypted', False)
     
-    if not from_address or from_address not in blockchain.wallets:
+    # Checked before admission: the message index keys on these as strings
+    if not isinstance(from_address, str) or from_address not in blockchain.wallets:
         return jsonify({"error": "Invalid sender"}), 400
     
+    if not to_address or not isinstance(to_address, str):
+        return jsonify({"error": "Invalid recipient"}), 400
+    
+    if not isinstance(message, str):
+        return jsonify({"error": "Message must be a string"}), 400
+    message = message[:280]  # Twitter-like limit
+    
     # Message fee: 0.01 QRC
     if blockchain.get_balance(from_address) < 0.01:
         return jsonify({"error": "Insufficient balance for message fee"}), 400
@@ -1224,25 +2605,17 @@ def send_message():
         'recipient': to_address,
         'message': message,
         'encrypted': encrypted,
+        'fee_paid': 0.01,
+        'developer_fee': 0.01,
+        'network_fee': 0,
         'timestamp': time.time(),
         'type': 'message'
     }
     
-    # Fee transaction
-    fee_tx = {
-        'sender': from_address,
-        'recipient': fee_manager.developer_address,
-        'amount': 0.01,
-        'type': 'message_fee',
-        'timestamp': time.time()
-    }
-    
     # Update balance
     blockchain.wallets[from_address]['balance'] -= 0.01
     
-    # Add transactions
     blockchain.add_transaction(message_tx)
-    blockchain.add_transaction(fee_tx)
     
     return jsonify({
         "success": True,
@@ -1250,62 +2623,150 @@ def send_message():
         "fee": 0.01
     })
 
-# Revenue Analytics Endpoint
-@app.route('/api/revenue/analytics', methods=['GET'])
-def revenue_analytics():
-    # Calculate total gas fees generated
-    total_gas = 0
+def message_page_args():
+    cursor = request.args.get('cursor')
+    cursor = int(cursor) if cursor not in (None, '') else None
+    limit = min(max(int(request.args.get('limit', DEFAULT_MESSAGE_PAGE)), 1), MAX_MESSAGE_PAGE)
+    return cursor, limit
+
+@app.route('/api/message/inbox/<address>', methods=['GET'])
+def message_inbox(address):
+    """Messages received by an address, newest first"""
+    try:
+        cursor, limit = message_page_args()
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
     
-    # Token creation fees
-    total_gas += len(tokens) * float(fee_manager.fees['features']['token_creation_fee'])
+    messages, next_cursor, total = blockchain.messages.inbox(address, cursor, limit)
+    return jsonify({
+        "address": address,
+        "total": total,
+        "messages": [m.to_dict() for m in messages],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/message/thread/<address>/<other>', methods=['GET'])
+def message_thread(address, other):
+    """Messages exchanged between two addresses, newest first"""
+    try:
+        cursor, limit = message_page_args()
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
     
-    # Token transfer fees
-    for token_address in tokens:
-        total_gas += token_transfers[token_address] * 0.1
+    messages, next_cursor, total = blockchain.messages.thread(address, other, cursor, limit)
+    return jsonify({
+        "participants": sorted([address, other]),
+        "total": total,
+        "messages": [m.to_dict() for m in messages],
+        "next_cursor": next_cursor
+    })
+
+# Live events (server-sent events)
+@app.route('/api/events', methods=['GET'])
+@limiter.exempt
+def stream_events():
+    """Push chain events instead of polling
+
+    ?topics= is a comma-separated list of: blocks, transactions,
+    address:<address>, token:<token address>, payment:<payment id>.
+    """
+    topics = [t.strip() for t in request.args.get('topics', 'blocks').split(',') if t.strip()]
+    if not topics or len(topics) > MAX_EVENT_TOPICS:
+        return jsonify({"error": f"Between 1 and {MAX_EVENT_TOPICS} topics required"}), 400
+    for topic in topics:
+        if topic not in ('blocks', 'transactions') and topic.split(':', 1)[0] not in ('address', 'token', 'payment'):
+            return jsonify({"error": f"Unknown topic: {topic}"}), 400
+    
+    if blockchain.events.subscriber_count >= MAX_EVENT_SUBSCRIBERS:
+        return jsonify({"error": "Too many event subscribers, try again later"}), 503
+    
+    subscription = blockchain.events.subscribe(topics)
+    
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                yield event if event is not None else ": keepalive\n\n"
+        finally:
+            blockchain.events.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Time-series rollups for dashboard charts
+@app.route('/api/timeseries', methods=['GET'])
+def get_timeseries():
+    metric = request.args.get('metric')
+    resolution = request.args.get('resolution', 'hour')
     
-    # Name registration fees (average)
-    total_gas += len(name_registry) * float(fee_manager.fees['features']['name_registration_fee'])
+    if not metric:
+        return jsonify({"error": "metric required", "metrics": blockchain.rollups.metrics()}), 400
     
-    # Storage fees
-    for user_storage in storage_usage.values():
-        for file_hash in user_storage["files"]:
-            if file_hash in storage_files:
-                total_gas += storage_files[file_hash]["monthly_fee"]
+    try:
+        start = float(request.args['from']) if 'from' in request.args else None
+        end = float(request.args['to']) if 'to' in request.args else None
+        points = blockchain.rollups.query(metric, resolution, start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Faucet gas fees
-    total_gas += len(faucet_claims) * 0.001
+    return jsonify({
+        "metric": metric,
+        "resolution": resolution,
+        "points": points
+    })
+
+# Revenue Analytics Endpoint
+@app.route('/api/revenue/analytics', methods=['GET'])
+@cached_response(vary=lambda: datetime.now(timezone.utc).date())
+def revenue_analytics():
+    # Read the aggregates kept by the revenue ledger as fees are collected
+    ledger = blockchain.revenue_ledger
+    revenue_streams = dict.fromkeys(
+        ["tokenCreation", "tokenTransfers", "nameService", "storage", "faucetFees", "transactionFees", "messages"], 0
+    )
+    revenue_streams.update(ledger.stream_summary())
     
     return jsonify({
-        "totalGasGenerated": total_gas,
-        "revenueStreams": {
-            "tokenCreation": len(tokens) * float(fee_manager.fees['features']['token_creation_fee']),
-            "tokenTransfers": sum(token_transfers.values()) * 0.1,
-            "nameService": len(name_registry) * float(fee_manager.fees['features']['name_registration_fee']),
-            "storage": sum(f["monthly_fee"] for f in storage_files.values()),
-            "faucetFees": len(faucet_claims) * 0.001
+        "totalGasGenerated": ledger.total_collected,
+        "revenueStreams": revenue_streams,
+        "todayRevenue": ledger.today_total(),
+        "dailyRevenue": ledger.daily_summary(),
+        "collectedFees": {
+            "developer": blockchain.fee_totals['developer_fees'],
+            "network": blockchain.fee_totals['network_fees'],
+            "payoutBlocks": blockchain.fee_totals['payouts']
         },
         "activeUsers": len(blockchain.wallets),
         "dailyTransactions": len(blockchain.transaction_pool),
         "feeAddresses": {
             "developer": fee_manager.developer_address[:10] + '...',
             "treasury": fee_manager.treasury_address[:10] + '...'
+        },
+        "feeAddressTotals": {
+            "developer": ledger.address_total(fee_manager.developer_address),
+            "treasury": ledger.address_total(fee_manager.treasury_address)
         }
     })
 
 # Serve HTML files
 @app.route('/')
+@limiter.exempt
 def serve_main():
-    if os.path.exists('quantum_web_wallet.html'):
-        return send_file('quantum_web_wallet.html')
-    else:
-        return "Wallet interface not found", 404        # Default to wallet for quantum-wallet domain or localhost
-        return send_file('quantum_web_wallet.html')
+    response = static_assets.serve(MAIN_PAGE, request)
+    if response is None:
+        return "Wallet interface not found", 404
+    return response
 
 @app.route('/<path:path>')
+@limiter.exempt
 def serve_static(path):
-    if os.path.exists(path):
-        return send_file(path)
-    return "File not found", 404
+    response = static_assets.serve(path, request)
+    if response is None:
+        return "File not found", 404
+    return response
 
 if __name__ == '__main__':
     # Get port from environment variable for Render
@@ -1320,7 +2781,7 @@ if __name__ == '__main__':
     ╚═══════════════════════════════════════════════════════════╝
     
     🔐 Quantum Security: ACTIVE
-    🚀 Signature Algorithm: CRYSTALS-Dilithium2 (NIST Level 2)
+    🚀 Signature Algorithm: {scheme.algorithm} (NIST Level {scheme.nist_level})
     ⚡ Network Status: ONLINE
     💰 Token System: ENABLED
     🌐 Name Service: ACTIVE
@@ -1348,7 +2809,8 @@ if __name__ == '__main__':
     """.format(
         fee_manager.developer_address[:10] if fee_manager.developer_address else "NOT_SET",
         fee_manager.treasury_address[:10] if fee_manager.treasury_address else "NOT_SET",
-        port
+        port,
+        scheme=signature_scheme
     ))
     
     # Run without debug mode in production
@@ -0,0 +1,137 @@
+# pubkey_registry.py
+import base64
+import sqlite3
+import threading
+from collections import OrderedDict
+from dilithium_wrapper import public_key_address
+from signature_schemes import DEFAULT_SCHEME
+
+DEFAULT_CACHE_SIZE = 20000  # Decoded keys kept in memory (about 26 MB of Dilithium2 keys)
+
+
+class PublicKeyRegistry:
+    """Maps addresses to the public keys they revealed on chain
+
+    An address reveals its key in its first signed transaction and the
+    key is registered once that transaction is mined. Later transactions
+    carry only the address and are verified against the key stored here.
+    Keys live in SQLite; recently used ones are kept decoded in an LRU
+    cache, so checking a known sender is a dictionary hit.
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # address -> (public key bytes, algorithm)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'registered': 0}
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS pubkeys ("
+                "address TEXT PRIMARY KEY, public_key BLOB NOT NULL, "
+                "algorithm TEXT NOT NULL DEFAULT 'CRYSTALS-Dilithium2')"
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(pubkeys)")]
+            if 'algorithm' not in columns:
+                # Registries created before keys recorded their scheme held only Dilithium2 keys
+                self.db.execute(
+                    "ALTER TABLE pubkeys ADD COLUMN algorithm TEXT NOT NULL DEFAULT 'CRYSTALS-Dilithium2'"
+                )
+
+    def _remember(self, address, entry):
+        self.cache[address] = entry
+        self.cache.move_to_end(address)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def lookup(self, address):
+        """(public key bytes, algorithm) registered for address, or None"""
+        with self.lock:
+            entry = self.cache.get(address)
+            if entry is not None:
+                self.cache.move_to_end(address)
+                self.stats['hits'] += 1
+                return entry
+
+            self.stats['misses'] += 1
+            row = self.db.execute(
+                "SELECT public_key, algorithm FROM pubkeys WHERE address = ?", (address,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (bytes(row[0]), row[1])
+            self._remember(address, entry)
+            return entry
+
+    def get(self, address):
+        """Public key bytes registered for address, or None"""
+        entry = self.lookup(address)
+        return entry[0] if entry else None
+
+    def register(self, address, public_key, algorithm=DEFAULT_SCHEME):
+        """Record the key an address revealed; True if it was not known yet
+
+        Raises ValueError if the key does not hash to the address or the
+        address already revealed a different key.
+        """
+        if public_key_address(public_key) != address:
+            raise ValueError("Public key does not match sender address")
+
+        known = self.lookup(address)
+        if known is not None:
+            if known != (public_key, algorithm):
+                raise ValueError("Sender already revealed a different public key")
+            return False
+
+        with self.lock:
+            with self.db:
+                self.db.execute(
+                    "INSERT OR IGNORE INTO pubkeys (address, public_key, algorithm) VALUES (?, ?, ?)",
+                    (address, public_key, algorithm)
+                )
+            self._remember(address, (public_key, algorithm))
+            self.stats['registered'] += 1
+        return True
+
+    def resolve(self, transaction):
+        """(public key, revealed) for a signed transaction's sender
+
+        revealed is True when the transaction carries a key the registry
+        does not have yet. Raises ValueError if no usable key is found or
+        the transaction names a different scheme than the key was
+        registered with.
+        """
+        sender = transaction.get('sender')
+        algorithm = transaction.get('signature_algorithm', DEFAULT_SCHEME)
+        entry = self.lookup(sender) if sender else None
+        if entry is not None and entry[1] != algorithm:
+            raise ValueError(f"Sender's public key is registered for {entry[1]}")
+        known = entry[0] if entry else None
+        encoded = transaction.get('public_key')
+        if encoded is None:
+            if known is None:
+                raise ValueError("Public key required until a transaction revealing it is mined")
+            return known, False
+
+        try:
+            public_key = base64.b64decode(encoded, validate=True)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid public key encoding")
+        if public_key_address(public_key) != sender:
+            raise ValueError("Public key does not match sender address")
+        if known is not None and known != public_key:
+            raise ValueError("Sender already revealed a different public key")
+        return public_key, known is None
+
+    def metrics(self):
+        with self.lock:
+            registered = self.db.execute("SELECT COUNT(*) FROM pubkeys").fetchone()[0]
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'registered_addresses': registered,
+                'cached': len(self.cache),
+                'cache_size': self.cache_size,
+                'cache_hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0,
+                **self.stats
+            }
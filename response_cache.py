@@ -0,0 +1,49 @@
+# response_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+class CachedResponse:
+    """Pre-serialized response body with its ETag"""
+
+    __slots__ = ('version', 'body', 'mimetype', 'etag')
+
+    def __init__(self, version, body, mimetype):
+        self.version = version
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha3_256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    """Caches read-only API responses until the ledger version changes"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key, version):
+        """Return the cached response for key if it is still current"""
+        entry = self.entries.get(key)
+        if entry is None or entry.version != version:
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        return entry
+
+    def put(self, key, version, body, mimetype):
+        """Store a serialized response, evicting the oldest entry when full"""
+        entry = CachedResponse(version, body, mimetype)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,96 @@
+# revenue_ledger.py
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from fee_manager import FEE_BASE_UNITS
+
+# Revenue stream for each transaction type that carries fees
+REVENUE_STREAMS = {
+    None: 'transactionFees',
+    'token_creation': 'tokenCreation',
+    'token_transfer': 'tokenTransfers',
+    'token_multi_transfer': 'tokenTransfers',
+    'name_registration': 'nameService',
+    'file_upload': 'storage',
+    'faucet_claim': 'faucetFees',
+    'message': 'messages'
+}
+
+
+class RevenueLedger:
+    """Running revenue totals, updated as fees are collected
+
+    Amounts are kept in integer base units so totals stay exact no matter
+    how many fees are added.
+    """
+
+    def __init__(self, developer_address, treasury_address, rollups=None):
+        self.developer_address = developer_address
+        self.treasury_address = treasury_address
+        self.rollups = rollups  # Optional RollupStore for per-stream fee charts
+        self.lock = threading.Lock()
+        self.stream_totals = defaultdict(int)
+        self.stream_counts = defaultdict(int)
+        self.daily_totals = defaultdict(lambda: defaultdict(int))
+        self.address_totals = defaultdict(int)
+        self.total = 0
+
+    def record_transaction(self, transaction):
+        """Add the fees carried by a transaction to the aggregates"""
+        developer_units = round(transaction.get('developer_fee', 0) * FEE_BASE_UNITS)
+        network_units = round(transaction.get('network_fee', 0) * FEE_BASE_UNITS)
+        if not developer_units and not network_units:
+            return
+
+        stream = REVENUE_STREAMS.get(transaction.get('type'), transaction.get('type'))
+        timestamp = transaction.get('timestamp') or time.time()
+        day = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+        units = developer_units + network_units
+
+        with self.lock:
+            self.stream_totals[stream] += units
+            self.stream_counts[stream] += 1
+            self.daily_totals[day][stream] += units
+            self.address_totals[self.developer_address] += developer_units
+            self.address_totals[self.treasury_address] += network_units
+            self.total += units
+
+        if self.rollups is not None:
+            self.rollups.record(f'fees.{stream}', units / FEE_BASE_UNITS, timestamp)
+
+    def stream_summary(self):
+        """Total QRC collected per stream"""
+        with self.lock:
+            return {
+                stream: units / FEE_BASE_UNITS
+                for stream, units in self.stream_totals.items()
+            }
+
+    def daily_summary(self, days=30):
+        """Per-day totals for the most recent days, oldest first"""
+        with self.lock:
+            recent = sorted(self.daily_totals)[-days:]
+            return [
+                {
+                    'date': day,
+                    'total': sum(self.daily_totals[day].values()) / FEE_BASE_UNITS,
+                    'streams': {
+                        stream: units / FEE_BASE_UNITS
+                        for stream, units in self.daily_totals[day].items()
+                    }
+                }
+                for day in recent
+            ]
+
+    def address_total(self, address):
+        return self.address_totals.get(address, 0) / FEE_BASE_UNITS
+
+    def today_total(self):
+        day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        with self.lock:
+            return sum(self.daily_totals.get(day, {}).values()) / FEE_BASE_UNITS
+
+    @property
+    def total_collected(self):
+        return self.total / FEE_BASE_UNITS
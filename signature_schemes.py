@@ -0,0 +1,110 @@
+# signature_schemes.py
+import hashlib
+import secrets
+from functools import lru_cache
+from typing import Tuple
+
+DEFAULT_SCHEME = 'CRYSTALS-Dilithium2'
+SEEDBYTES = 32
+
+# Expanded keypairs kept for recently used seeds, so hot signers do not
+# re-derive their keys on every signature (about 16 MB of Dilithium2 keys)
+EXPANDED_KEY_CACHE_SIZE = 4096
+
+
+class SignatureScheme:
+    """One post-quantum signature algorithm and its parameter sizes
+
+    Sizes are those of the PQClean implementation named by pqclean.
+    Operations are simulated the same way DilithiumSigner always has
+    been: keys are expanded from a 32-byte seed with SHAKE-256 and
+    signatures have the scheme's real length, so byte counts are exact
+    but timings are not the scheme's. A production build replaces
+    expand_seed, sign and verify with PQClean bindings and clears
+    simulated.
+    """
+
+    simulated = True
+
+    def __init__(self, algorithm, pqclean, nist_level, public_key_bytes, secret_key_bytes, signature_bytes):
+        self.algorithm = algorithm
+        self.pqclean = pqclean
+        self.nist_level = nist_level
+        self.public_key_bytes = public_key_bytes
+        self.secret_key_bytes = secret_key_bytes
+        self.signature_bytes = signature_bytes
+
+    def generate_seed(self) -> bytes:
+        return secrets.token_bytes(SEEDBYTES)
+
+    def expand_seed(self, seed: bytes) -> Tuple[bytes, bytes]:
+        """Derive the (public_key, secret_key) pair for a 32-byte seed, uncached"""
+        # Simulated expansion; in production this calls crypto_sign_seed_keypair
+        stream = hashlib.shake_256(self.algorithm.encode() + seed).digest(
+            self.public_key_bytes + self.secret_key_bytes
+        )
+        return stream[:self.public_key_bytes], stream[self.public_key_bytes:]
+
+    def keypair_from_seed(self, seed: bytes) -> Tuple[bytes, bytes]:
+        """Derive a keypair from its seed, from the LRU cache when possible"""
+        if len(seed) != SEEDBYTES:
+            raise ValueError(f"Seed must be {SEEDBYTES} bytes")
+        return _expand_seed_cached(self.algorithm, bytes(seed))
+
+    def sign(self, message: bytes, secret_key: bytes) -> bytes:
+        # Simulated; in production this calls crypto_sign_signature
+        return secrets.token_bytes(self.signature_bytes)
+
+    def verify(self, signature: bytes, message: bytes, public_key: bytes) -> bool:
+        # Simulated; in production this calls crypto_sign_verify
+        return len(signature) == self.signature_bytes and len(public_key) == self.public_key_bytes
+
+    def transaction_overhead(self, reveal_public_key=False):
+        """Bytes a signature (and a revealed key) add to a JSON transaction"""
+        encoded = lambda size: 4 * ((size + 2) // 3)  # Base64 length
+        overhead = encoded(self.signature_bytes)
+        if reveal_public_key:
+            overhead += encoded(self.public_key_bytes)
+        return overhead
+
+    def info(self):
+        return {
+            'algorithm': self.algorithm,
+            'pqclean': self.pqclean,
+            'nist_level': self.nist_level,
+            'simulated': self.simulated,
+            'key_sizes': {
+                'public_key': self.public_key_bytes,
+                'secret_key': self.secret_key_bytes,
+                'signature': self.signature_bytes
+            }
+        }
+
+
+@lru_cache(maxsize=EXPANDED_KEY_CACHE_SIZE)
+def _expand_seed_cached(algorithm, seed):
+    return SCHEMES[algorithm].expand_seed(seed)
+
+
+SCHEMES = {}  # algorithm id (as recorded in transactions) -> SignatureScheme
+
+
+def register_scheme(scheme):
+    SCHEMES[scheme.algorithm] = scheme
+    return scheme
+
+
+def get_scheme(algorithm=None):
+    """Scheme for an algorithm id; the default scheme when None"""
+    try:
+        return SCHEMES[algorithm or DEFAULT_SCHEME]
+    except KeyError:
+        raise ValueError(f"Unsupported signature algorithm: {algorithm}")
+
+
+register_scheme(SignatureScheme('CRYSTALS-Dilithium2', 'dilithium2', 2, 1312, 2528, 2420))
+register_scheme(SignatureScheme('CRYSTALS-Dilithium3', 'dilithium3', 3, 1952, 4000, 3293))
+register_scheme(SignatureScheme('CRYSTALS-Dilithium5', 'dilithium5', 5, 2592, 4864, 4595))
+register_scheme(SignatureScheme('Falcon-512', 'falcon-padded-512', 1, 897, 1281, 666))
+register_scheme(SignatureScheme('SPHINCS+-SHAKE-128f', 'sphincs-shake-128f-simple', 1, 32, 64, 17088))
+register_scheme(SignatureScheme('SPHINCS+-SHAKE-128s', 'sphincs-shake-128s-simple', 1, 32, 64, 7856))
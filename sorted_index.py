@@ -0,0 +1,79 @@
+# sorted_index.py
+from bisect import bisect_left, bisect_right, insort
+
+
+class SortedIndex:
+    """Keys kept in sorted order
+
+    A list of sorted buckets: inserts and removals touch one bucket and
+    the bucket index, so they stay fast with millions of keys.
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        self.buckets = []
+        self.maxes = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key):
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+        else:
+            i = min(bisect_left(self.maxes, key), len(self.buckets) - 1)
+            bucket = self.buckets[i]
+            insort(bucket, key)
+            self.maxes[i] = bucket[-1]
+            if len(bucket) > 2 * self.LOAD:
+                self.buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+                self.maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+        self.size += 1
+
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.buckets):
+            raise KeyError(key)
+        bucket = self.buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        if bucket:
+            self.maxes[i] = bucket[-1]
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+        self.size -= 1
+
+    def rank(self, key):
+        """Zero-based position of a key that is in the index"""
+        i = bisect_left(self.maxes, key)
+        return sum(len(b) for b in self.buckets[:i]) + bisect_right(self.buckets[i], key) - 1
+
+    def slice(self, offset, limit):
+        """Up to limit keys starting at position offset"""
+        result = []
+        for bucket in self.buckets:
+            if offset >= len(bucket):
+                offset -= len(bucket)
+                continue
+            result.extend(bucket[offset:offset + limit - len(result)])
+            offset = 0
+            if len(result) >= limit:
+                break
+        return result
+
+    def iter_from(self, key, inclusive=True):
+        """Keys greater than (or equal to) key, in order"""
+        find = bisect_left if inclusive else bisect_right
+        i = find(self.maxes, key)
+        if i == len(self.buckets):
+            return
+        j = find(self.buckets[i], key)
+        for bucket in self.buckets[i:]:
+            yield from bucket[j:]
+            j = 0
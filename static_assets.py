@@ -0,0 +1,109 @@
+# static_assets.py
+import gzip
+import hashlib
+import mimetypes
+import os
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped when the package is missing
+    brotli = None
+
+# Files that may be served from the site root
+STATIC_EXTENSIONS = {'.html', '.js', '.css', '.png', '.jpg', '.jpeg', '.svg', '.ico', '.webp', '.woff2'}
+
+# HTML pages the site serves; other .html files (backups, drafts) are skipped
+SERVED_PAGES = {
+    'quantum_web_wallet.html', 'block_explorer.html', 'revenue_dashboard.html',
+    'payment_page.html', 'token_creator.html', 'quantum_web_wallet_production.html'
+}
+
+# Already-compressed formats are served as-is
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.svg'}
+
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+
+class StaticAsset:
+    """One static file held in memory with precompressed variants"""
+
+    __slots__ = ('name', 'mimetype', 'etag', 'variants')
+
+    def __init__(self, name, data, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        self.etag = hashlib.sha3_256(data).hexdigest()[:32]
+        self.variants = {'identity': data}
+
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                self.variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    self.variants['br'] = compressed
+
+
+class StaticAssetStore:
+    """Loads allowed assets at startup and serves them from memory"""
+
+    def __init__(self, directory='.', extensions=STATIC_EXTENSIONS, pages=SERVED_PAGES):
+        self.directory = directory
+        self.extensions = extensions
+        self.pages = pages
+        self.assets = {}
+
+    def load(self):
+        """Read every allowed file in the directory (not recursive)"""
+        assets = {}
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            extension = os.path.splitext(name)[1].lower()
+            if not os.path.isfile(path) or extension not in self.extensions:
+                continue
+            if extension == '.html' and name not in self.pages:
+                continue
+
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            assets[name] = StaticAsset(name, data, mimetype)
+
+        self.assets = assets
+        return len(assets)
+
+    def get(self, name):
+        return self.assets.get(name)
+
+    def serve(self, name, request):
+        """Build a response for an asset, or None if it is not served"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        # Prefer brotli, then gzip, when the client accepts them
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and candidate in request.accept_encodings:
+                encoding = candidate
+                break
+
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(f"{asset.etag}-{encoding}")
+        response.headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+
+        return response.make_conditional(request)
+
+    def stats(self):
+        """Bytes held per encoding"""
+        totals = {}
+        for asset in self.assets.values():
+            for encoding, data in asset.variants.items():
+                totals[encoding] = totals.get(encoding, 0) + len(data)
+        return {'assets': len(self.assets), 'bytes': totals}
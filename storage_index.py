@@ -0,0 +1,166 @@
+# storage_index.py
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from fee_manager import FEE_BASE_UNITS
+from sorted_index import SortedIndex
+
+
+class StoredFile:
+    """One file held by one owner
+
+    holds_chunks is True when this record owns a chunk-store reference
+    (the bytes were uploaded), False for files registered by hash only.
+    """
+
+    __slots__ = ('seq', 'file_hash', 'name', 'size', 'uploaded', 'monthly_fee', 'holds_chunks')
+
+    def __init__(self, seq, file_hash, name, size, uploaded, monthly_fee, holds_chunks=False):
+        self.seq = seq
+        self.file_hash = file_hash
+        self.name = name
+        self.size = size
+        self.uploaded = uploaded
+        self.monthly_fee = monthly_fee
+        self.holds_chunks = holds_chunks
+
+    def to_dict(self, owner):
+        return {
+            "owner": owner,
+            "hash": self.file_hash,
+            "name": self.name,
+            "size": self.size,
+            "uploaded": datetime.fromtimestamp(self.uploaded).isoformat(),
+            "monthly_fee": self.monthly_fee
+        }
+
+
+class OwnerStorage:
+    """Files and running totals for one owner"""
+
+    __slots__ = ('used', 'monthly_fee_units', 'files', 'order', 'by_seq', 'next_seq')
+
+    def __init__(self):
+        self.used = 0
+        self.monthly_fee_units = 0
+        self.files = {}             # file_hash -> StoredFile
+        self.order = SortedIndex()  # Upload sequence numbers, oldest first
+        self.by_seq = {}            # seq -> file_hash
+        self.next_seq = 1
+
+
+class StorageIndex:
+    """Per-owner storage records with totals kept as files come and go
+
+    Usage, file count and monthly fee are updated on every add and
+    remove, so reading them or checking a quota never walks the files.
+    """
+
+    def __init__(self, quota_bytes=None):
+        self.quota_bytes = quota_bytes
+        self.lock = threading.Lock()
+        self.owners = defaultdict(OwnerStorage)
+        self.holders = defaultdict(set)  # file_hash -> owners
+
+    def usage(self, owner):
+        storage = self.owners.get(owner)
+        if storage is None:
+            return {"used": 0, "files": 0, "monthly_fee": 0.0}
+        return {
+            "used": storage.used,
+            "files": len(storage.files),
+            "monthly_fee": storage.monthly_fee_units / FEE_BASE_UNITS
+        }
+
+    def has_room(self, owner, size):
+        """Whether size more bytes fit in the owner's quota"""
+        if self.quota_bytes is None:
+            return True
+        storage = self.owners.get(owner)
+        return (storage.used if storage else 0) + size <= self.quota_bytes
+
+    def get(self, owner, file_hash):
+        storage = self.owners.get(owner)
+        return storage.files.get(file_hash) if storage else None
+
+    def add(self, owner, file_hash, name, size, monthly_fee, uploaded=None, holds_chunks=False):
+        """Record a file for an owner
+
+        The duplicate and quota checks happen under the same lock as the
+        insert. Raises ValueError if the owner already holds the file or
+        it does not fit in the quota.
+        """
+        uploaded = time.time() if uploaded is None else uploaded
+        with self.lock:
+            storage = self.owners.get(owner)
+            if storage is not None and file_hash in storage.files:
+                raise ValueError("File already stored")
+            used = storage.used if storage is not None else 0
+            if self.quota_bytes is not None and used + size > self.quota_bytes:
+                raise ValueError("Storage quota exceeded")
+
+            storage = self.owners[owner]
+            record = StoredFile(storage.next_seq, file_hash, name, size, uploaded, monthly_fee, holds_chunks)
+            storage.next_seq += 1
+            storage.files[file_hash] = record
+            storage.order.add(record.seq)
+            storage.by_seq[record.seq] = file_hash
+            storage.used += size
+            storage.monthly_fee_units += round(monthly_fee * FEE_BASE_UNITS)
+            self.holders[file_hash].add(owner)
+            return record
+
+    def claim_chunks(self, owner, file_hash):
+        """Attach an uploaded copy to a hash-only record; True if it took the reference"""
+        with self.lock:
+            storage = self.owners.get(owner)
+            record = storage.files.get(file_hash) if storage else None
+            if record is None or record.holds_chunks:
+                return False
+            record.holds_chunks = True
+            return True
+
+    def remove(self, owner, file_hash):
+        """Drop an owner's file and return its record (KeyError if absent)"""
+        with self.lock:
+            storage = self.owners.get(owner)
+            if storage is None or file_hash not in storage.files:
+                raise KeyError(file_hash)
+
+            record = storage.files.pop(file_hash)
+            storage.order.remove(record.seq)
+            del storage.by_seq[record.seq]
+            storage.used -= record.size
+            storage.monthly_fee_units -= round(record.monthly_fee * FEE_BASE_UNITS)
+            if not storage.files:
+                del self.owners[owner]
+
+            owners = self.holders[file_hash]
+            owners.discard(owner)
+            if not owners:
+                del self.holders[file_hash]
+            return record
+
+    def list_files(self, owner, cursor=0, limit=50):
+        """Files uploaded after cursor, oldest first, and the next cursor"""
+        with self.lock:
+            storage = self.owners.get(owner)
+            if storage is None:
+                return [], None
+
+            records = []
+            for seq in storage.order.iter_from(cursor, inclusive=False):
+                records.append(storage.files[storage.by_seq[seq]])
+                if len(records) == limit:
+                    break
+
+            has_more = records and records[-1].seq != storage.order.slice(len(storage.order) - 1, 1)[0]
+            return records, records[-1].seq if has_more else None
+
+    def find(self, file_hash):
+        """Any owner's record of a file, or None"""
+        with self.lock:
+            for owner in self.holders.get(file_hash, ()):
+                return owner, self.owners[owner].files[file_hash]
+        return None
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from chunk_store import ChunkStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChunkStore(str(tmp_path), chunk_size=4)
+    yield store
+    store.stop_sweeper()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_sweeper_purges_abandoned_uploads(store):
+    stale = store.begin_upload(8)
+    stale.updated -= 3600
+    fresh = store.begin_upload(8)
+
+    store.start_sweeper(interval=0.05, max_age=60)
+
+    assert wait_for(lambda: stale.id not in store.uploads)
+    assert fresh.id in store.uploads
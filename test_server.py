@@ -0,0 +1,134 @@
+import importlib
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    """The Flask app with its on-disk state kept in a temporary directory"""
+    root = tmp_path_factory.mktemp('server')
+    os.environ.update({
+        'PUBKEY_DB': str(root / 'pubkeys.db'),
+        'STORAGE_DIR': str(root / 'storage'),
+        'KEYSTORE_DIR': str(root / 'keystores'),
+        'PAYMENT_ARCHIVE': str(root / 'payment_archive.ndjson'),
+        'WEBHOOK_OUTBOX': str(root / 'webhook_outbox.db'),
+        'KEYPAIR_POOL_SIZE': '50',
+        'BULK_WALLET_WORKERS': '1'
+    })
+    for name in ('PQC_DEVELOPER_ADDRESS', 'DEVELOPER_WALLET'):
+        os.environ.setdefault(name, 'QRCDEVELOPER000000000000000000')
+    for name in ('PQC_TREASURY_ADDRESS', 'TREASURY_WALLET'):
+        os.environ.setdefault(name, 'QRCTREASURY0000000000000000000')
+    module = importlib.import_module('pqc_blockchain_server_enhanced')
+    module.limiter.enabled = False
+    module.DDOS_THRESHOLD = 10 ** 9
+    return module
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def wallet(server, client):
+    """Create a wallet holding balance QRC and return its address"""
+    def make(balance=1000.0):
+        address = client.post('/api/wallet/create', json={}).get_json()['address']
+        server.blockchain.wallets[address]['balance'] = balance
+        return address
+    return make
+
+
+@pytest.mark.parametrize('amount', ['nan', 'inf', '-inf', 1e400, 0, -5, 'ten'])
+def test_batch_rejects_invalid_amounts(client, wallet, amount):
+    sender, recipient = wallet(), wallet()
+    response = client.post('/api/transaction/send_batch', json={'transactions': [
+        {'sender': sender, 'recipient': recipient, 'amount': amount},
+        {'sender': sender, 'recipient': recipient, 'amount': 1}
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['accepted'] == 1
+    assert body['results'][0] == {'index': 0, 'success': False, 'error': 'Invalid amount'}
+    assert body['results'][1]['success']
+
+
+@pytest.mark.parametrize('recipient', [['QRCsomeone'], 7, ''])
+def test_token_transfer_rejects_non_string_recipient(server, client, wallet, recipient):
+    creator = wallet()
+    token = client.post('/api/token/create', json={
+        'creator': creator, 'name': 'Test', 'symbol': 'TST', 'totalSupply': 1000
+    }).get_json()['tokenAddress']
+
+    response = client.post('/api/token/transfer', json={
+        'tokenAddress': token, 'from': creator, 'to': recipient, 'amount': 10
+    })
+
+    assert response.status_code == 400
+    assert server.token_ledger.balance_of(token, creator) == 1000
+
+
+@pytest.mark.parametrize('size', [-1, 'big', [1]])
+def test_storage_upload_rejects_bad_size(server, client, wallet, size):
+    owner = wallet()
+    response = client.post('/api/storage/upload', json={
+        'owner': owner, 'hash': 'ab' * 32, 'size': size, 'name': 'file.bin'
+    })
+
+    assert response.status_code == 400
+    assert server.blockchain.get_balance(owner) == 1000.0
+
+
+def test_ledger_version_changes_after_indexes(server, monkeypatch):
+    blockchain = server.blockchain
+    transaction = {'sender': 'QRCsender', 'recipient': 'QRCrecipient', 'amount': 0,
+                   'fee_paid': 2.5, 'developer_fee': 1.0, 'network_fee': 1.5,
+                   'type': 'message', 'timestamp': time.time()}
+    seen = []
+    note_state_change = blockchain.note_state_change
+
+    def check_indexes():
+        # A reader seeing the new version must also see the admitted transaction
+        seen.append(blockchain.revenue_ledger.total_collected)
+        note_state_change()
+
+    before = blockchain.revenue_ledger.total_collected
+    monkeypatch.setattr(blockchain, 'note_state_change', check_indexes)
+    blockchain.add_transaction(transaction)
+
+    assert seen and seen[0] > before
+
+
+def block_with(server, transactions):
+    blockchain = server.blockchain
+    return {'index': len(blockchain.chain), 'transactions': transactions, 'timestamp': time.time(),
+            'previous_hash': blockchain.last_block.hash, 'nonce': 0, 'hash': '0' * 64}
+
+
+@pytest.mark.parametrize('tamper, error', [
+    (lambda payout: [], 'fee payout does not match'),
+    (lambda payout: [payout, dict(payout)], 'more than one fee payout'),
+    (lambda payout: [{**payout, 'developer_fees': 50.0}], 'fee payout does not match'),
+    (lambda payout: [{**payout, 'payouts': {'QRCminer': 1.0}}], 'fee payout does not match'),
+])
+def test_import_rejects_forged_fee_payout(server, tamper, error):
+    transfer = {'sender': 'QRCsender', 'recipient': 'QRCrecipient', 'amount': 5,
+                'developer_fee': 0.5, 'network_fee': 0.5, 'timestamp': time.time()}
+    payout = server.fee_manager.create_block_fee_payout([transfer], transfer['timestamp'])
+
+    with pytest.raises(ValueError, match=error):
+        server.blockchain.import_block(block_with(server, [transfer] + tamper(payout)))
+    with pytest.raises(ValueError, match='hash mismatch'):
+        server.blockchain.import_block(block_with(server, [transfer, payout]))
+
+
+def test_import_rejects_payout_without_fees(server):
+    payout = {'sender': 'NETWORK_FEES', 'type': 'fee_payout', 'payouts': {'QRCminer': 1.0},
+              'developer_fees': 1.0, 'network_fees': 0, 'timestamp': time.time()}
+    with pytest.raises(ValueError, match='fee payout does not match'):
+        server.blockchain.import_block(block_with(server, [payout]))
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+from flask import Flask, request
+
+import static_assets
+from static_assets import StaticAssetStore
+
+PAGES = [
+    'quantum_web_wallet.html', 'block_explorer.html', 'revenue_dashboard.html',
+    'payment_page.html', 'token_creator.html', 'quantum_web_wallet_production.html'
+]
+
+
+@pytest.fixture(scope='module')
+def store():
+    store = StaticAssetStore(os.path.dirname(os.path.abspath(__file__)))
+    store.load()
+    return store
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page_is_served_compressed(store, page):
+    asset = store.get(page)
+    assert asset is not None
+    expected = {'identity', 'gzip'} | ({'br'} if static_assets.brotli else set())
+    assert expected <= set(asset.variants)
+
+    app = Flask(__name__)
+    for encoding in expected - {'identity'}:
+        with app.test_request_context(f"/{page}", headers={'Accept-Encoding': encoding}):
+            response = store.serve(page, request)
+        assert response.headers['Content-Encoding'] == encoding
+        assert response.get_data() == asset.variants[encoding]
+
+
+def test_drafts_and_backups_are_skipped(store):
+    assert store.get('quantum_web_wallet_backup.html') is None
+    assert store.serve('quantum_web_wallet_old.html', None) is None
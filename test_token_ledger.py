@@ -0,0 +1,42 @@
+import pytest
+
+from token_ledger import TokenLedger
+
+
+@pytest.fixture
+def ledger():
+    ledger = TokenLedger()
+    ledger.mint('TOKEN', 'alice', 100)
+    ledger.mint('TOKEN', 'bob', 50)
+    return ledger
+
+
+def test_transfer_updates_balances_and_rankings(ledger):
+    ledger.transfer('TOKEN', 'alice', 'carol', 60)
+    assert ledger.balance_of('TOKEN', 'alice') == 40
+    assert ledger.balance_of('TOKEN', 'carol') == 60
+    assert ledger.top_holders('TOKEN') == [('carol', 60), ('bob', 50), ('alice', 40)]
+
+
+def test_transfer_to_self_keeps_balance(ledger):
+    ledger.transfer('TOKEN', 'alice', 'alice', 30)
+    assert ledger.balance_of('TOKEN', 'alice') == 100
+    assert ledger.holder_count('TOKEN') == 2
+
+
+@pytest.mark.parametrize('recipient', [['carol'], 7, None, ''])
+def test_invalid_recipient_leaves_supply_intact(ledger, recipient):
+    with pytest.raises(ValueError):
+        ledger.transfer('TOKEN', 'alice', recipient, 10)
+    with pytest.raises(ValueError):
+        ledger.multi_transfer('TOKEN', 'alice', [('bob', 5), (recipient, 10)])
+
+    assert ledger.balance_of('TOKEN', 'alice') == 100
+    assert ledger.balance_of('TOKEN', 'bob') == 50
+    assert ledger.top_holders('TOKEN') == [('alice', 100), ('bob', 50)]
+
+
+def test_insufficient_balance_is_rejected(ledger):
+    with pytest.raises(ValueError):
+        ledger.transfer('TOKEN', 'bob', 'alice', 51)
+    assert ledger.balance_of('TOKEN', 'bob') == 50
@@ -0,0 +1,119 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from webhook_dispatcher import WebhookDispatcher
+
+
+def start_stub(handle):
+    """Local HTTP server answering each POST with handle(path, headers, body)"""
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(handle(self.path, self.headers, body))
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(handle):
+        server, base = start_stub(handle)
+        servers.append(server)
+        return base
+
+    yield make
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def dispatchers(tmp_path):
+    created = []
+
+    def make(**kwargs):
+        dispatcher = WebhookDispatcher(str(tmp_path / f"outbox{len(created)}.db"), **kwargs)
+        created.append(dispatcher)
+        dispatcher.start()
+        return dispatcher
+
+    yield make
+    for dispatcher in created:
+        dispatcher.stop()
+
+
+def test_failed_delivery_is_retried_with_signature(stubs, dispatchers):
+    seen = defaultdict(int)
+    signatures = []
+
+    def handle(path, headers, body):
+        seen[path] += 1
+        signatures.append(headers['X-QRC-Signature'] ==
+                          hmac.new(b'secret', body, hashlib.sha256).hexdigest())
+        return 503 if seen[path] == 1 else 200
+
+    base = stubs(handle)
+    dispatcher = dispatchers(base_delay=0.05, secret='secret')
+    ids = [dispatcher.enqueue(f"{base}/hook/{i}", {'n': i}) for i in range(10)]
+
+    assert wait_for(lambda: dispatcher.stats()['delivered'] == len(ids))
+    assert all(count == 2 for count in seen.values())
+    assert all(signatures)
+    assert dispatcher.status(ids[0])['attempts'] == 2
+    assert dispatcher.stats()['retried'] == len(ids)
+
+
+def test_saturated_host_does_not_starve_others(stubs, dispatchers):
+    release = threading.Event()
+    slow = stubs(lambda path, headers, body: release.wait(10) and 200)
+    fast = stubs(lambda path, headers, body: 200)
+    dispatcher = dispatchers(workers=4, per_host=2)
+
+    # More rows for the stalled host than a single page of due rows
+    for i in range(150):
+        dispatcher.enqueue(f"{slow}/hook", {'n': i})
+    delivery = dispatcher.enqueue(f"{fast}/hook", {'n': 'fast'})
+
+    try:
+        assert wait_for(lambda: dispatcher.status(delivery)['status'] == 'delivered', timeout=5)
+    finally:
+        release.set()
+
+
+def test_delivered_rows_are_pruned(stubs, dispatchers):
+    base = stubs(lambda path, headers, body: 200)
+    dispatcher = dispatchers(retention=0)
+    delivery = dispatcher.enqueue(f"{base}/hook", {'event': 'payment.completed'})
+    assert wait_for(lambda: dispatcher.status(delivery)['status'] == 'delivered')
+
+    with dispatcher.lock:
+        dispatcher._prune(time.time() + 1)
+    assert dispatcher.status(delivery) is None
+    assert dispatcher.stats()['delivered'] == 1
+
+
+def test_invalid_url_is_rejected(dispatchers):
+    with pytest.raises(ValueError):
+        dispatchers().enqueue('ftp://example.com/hook', {})
@@ -0,0 +1,89 @@
+# timeseries.py
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+# Bucket width (seconds) and number of buckets kept per resolution
+RESOLUTIONS = {
+    'minute': (60, 24 * 60),       # Last 24 hours
+    'hour': (3600, 30 * 24),       # Last 30 days
+    'day': (86400, 2 * 365)        # Last 2 years
+}
+
+
+class RollupSeries:
+    """Fixed-size ring of time buckets for one metric at one resolution"""
+
+    __slots__ = ('width', 'size', 'values', 'starts')
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.values = array('d', bytes(8 * size))
+        self.starts = array('q', bytes(8 * size))  # Bucket start time held in each slot
+
+    def add(self, timestamp, value):
+        start = int(timestamp) // self.width * self.width
+        slot = (start // self.width) % self.size
+        if start < self.starts[slot]:
+            return  # Older than the retention window
+        # A slot holding an older bucket has aged out and is reused
+        if self.starts[slot] != start:
+            self.starts[slot] = start
+            self.values[slot] = 0.0
+        self.values[slot] += value
+
+    def range(self, start, end):
+        """Buckets between start and end (inclusive), oldest first"""
+        first = max(int(start) // self.width, int(end) // self.width - self.size + 1)
+        last = int(end) // self.width
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.size
+            bucket_start = bucket * self.width
+            value = self.values[slot] if self.starts[slot] == bucket_start else 0.0
+            points.append([bucket_start, value])
+        return points
+
+
+class RollupStore:
+    """Per-minute, per-hour and per-day counters for dashboard charts
+
+    Every recorded value is added to one bucket at each resolution, so a
+    chart query reads a fixed number of buckets however long the history.
+    """
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self.lock = threading.Lock()
+        self.series = defaultdict(self._new_series)
+
+    def _new_series(self):
+        return {
+            name: RollupSeries(width, size)
+            for name, (width, size) in self.resolutions.items()
+        }
+
+    def record(self, metric, value=1, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            for series in self.series[metric].values():
+                series.add(timestamp, value)
+
+    def query(self, metric, resolution, start=None, end=None):
+        """Return [bucket_start, value] points for a metric"""
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        width, size = self.resolutions[resolution]
+        end = time.time() if end is None else end
+        start = end - width * (size - 1) if start is None else start
+
+        with self.lock:
+            if metric not in self.series:
+                return []
+            return self.series[metric][resolution].range(start, end)
+
+    def metrics(self):
+        return sorted(self.series)
@@ -0,0 +1,135 @@
+# token_ledger.py
+import threading
+from collections import defaultdict
+from sorted_index import SortedIndex
+
+
+class RankedBalances(SortedIndex):
+    """Holders of one token ordered by balance (largest first)"""
+
+    def add(self, balance, holder):
+        super().add((-balance, holder))
+
+    def remove(self, balance, holder):
+        super().remove((-balance, holder))
+
+    def rank(self, balance, holder):
+        """Zero-based position of a holder (0 is the largest balance)"""
+        return super().rank((-balance, holder))
+
+    def slice(self, offset, limit):
+        """(holder, balance) pairs from offset, largest balances first"""
+        return [
+            (holder, -negative_balance)
+            for negative_balance, holder in super().slice(offset, limit)
+        ]
+
+
+def _check_holder(holder):
+    # Holders are sorted alongside each other in the rankings, so mixed
+    # types would fail halfway through an update
+    if not isinstance(holder, str) or not holder:
+        raise ValueError("Holder address must be a non-empty string")
+
+
+class TokenLedger:
+    """Token balances with holder, holdings and ranking indexes"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.balances = {}                   # (token, holder) -> balance
+        self.holdings = defaultdict(set)     # holder -> tokens held
+        self.rankings = defaultdict(RankedBalances)  # token -> holders by balance
+
+    def balance_of(self, token, holder):
+        return self.balances.get((token, holder), 0)
+
+    def holder_count(self, token):
+        ranking = self.rankings.get(token)
+        return len(ranking) if ranking else 0
+
+    def _set_balance(self, token, holder, balance):
+        key = (token, holder)
+        old = self.balances.get(key, 0)
+        if old == balance:
+            return
+
+        ranking = self.rankings[token]
+        if old:
+            ranking.remove(old, holder)
+        if balance:
+            ranking.add(balance, holder)
+            self.balances[key] = balance
+            self.holdings[holder].add(token)
+        else:
+            del self.balances[key]
+            tokens = self.holdings.get(holder)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.holdings[holder]
+
+    def mint(self, token, holder, amount):
+        """Credit newly created supply to a holder"""
+        if amount < 0:
+            raise ValueError("Mint amount must not be negative")
+        with self.lock:
+            self._set_balance(token, holder, self.balance_of(token, holder) + amount)
+
+    def transfer(self, token, sender, recipient, amount):
+        """Move tokens between holders, raising ValueError if not possible"""
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+        _check_holder(sender)
+        _check_holder(recipient)
+
+        with self.lock:
+            sender_balance = self.balance_of(token, sender)
+            if sender_balance < amount:
+                raise ValueError("Insufficient token balance")
+            if sender == recipient:
+                return
+
+            # Both balances are known before either index changes
+            recipient_balance = self.balance_of(token, recipient) + amount
+            self._set_balance(token, sender, sender_balance - amount)
+            self._set_balance(token, recipient, recipient_balance)
+
+    def multi_transfer(self, token, sender, transfers):
+        """Move tokens from one sender to many recipients atomically
+
+        transfers is a list of (recipient, amount) pairs. Either every
+        transfer is applied or, on ValueError, none are.
+        """
+        credits = defaultdict(int)
+        total = 0
+        _check_holder(sender)
+        for recipient, amount in transfers:
+            if amount <= 0:
+                raise ValueError("Transfer amount must be positive")
+            _check_holder(recipient)
+            credits[recipient] += amount
+            total += amount
+
+        with self.lock:
+            sender_balance = self.balance_of(token, sender)
+            if sender_balance < total:
+                raise ValueError("Insufficient token balance")
+            self._set_balance(token, sender, sender_balance - total)
+            for recipient, amount in credits.items():
+                self._set_balance(token, recipient, self.balance_of(token, recipient) + amount)
+        return total
+
+    def top_holders(self, token, offset=0, limit=50):
+        """Holders ordered by balance, largest first"""
+        with self.lock:
+            ranking = self.rankings.get(token)
+            return ranking.slice(offset, limit) if ranking else []
+
+    def tokens_of(self, holder):
+        """(token, balance) pairs for every token a holder owns"""
+        with self.lock:
+            return [
+                (token, self.balances[(token, holder)])
+                for token in sorted(self.holdings.get(holder, ()))
+            ]
@@ -0,0 +1,226 @@
+# webhook_dispatcher.py
+import hashlib
+import hmac
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class WebhookDispatcher:
+    """Delivers webhooks from a durable outbox on background workers
+
+    enqueue() only writes a row to an SQLite outbox, so callers never
+    wait on the receiving server. Workers claim due rows, POST them
+    through one pooled requests.Session per host and reschedule failures
+    with exponential backoff. At most per_host deliveries run against one
+    host at a time, so a slow merchant cannot occupy every worker.
+    Rows left in flight by a crash are retried on the next start, and
+    delivered rows are deleted once they are older than retention.
+    """
+
+    def __init__(self, path, workers=4, per_host=2, max_attempts=8,
+                 base_delay=1.0, max_delay=600.0, timeout=10.0, secret=None,
+                 retention=24 * 3600):
+        self.workers = workers
+        self.per_host = per_host
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.secret = secret.encode() if secret else None
+        self.retention = retention
+        self.pruned_at = 0.0
+
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.running = False
+        self.threads = []
+        self.sessions = {}                   # host -> requests.Session
+        self.in_flight = defaultdict(int)    # host -> deliveries running
+        self.metrics = {
+            'enqueued': 0, 'delivered': 0, 'retried': 0, 'failed': 0,
+            'latency_total': 0.0, 'by_host': defaultdict(lambda: {'delivered': 0, 'errors': 0})
+        }
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, host TEXT NOT NULL, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "next_attempt REAL NOT NULL, last_error TEXT, created REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)")
+            # Deliveries interrupted by a restart are tried again
+            self.db.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+
+    def enqueue(self, url, payload):
+        """Queue a JSON payload for delivery and return its id"""
+        host = urlsplit(url).netloc
+        if urlsplit(url).scheme not in ('http', 'https') or not host:
+            raise ValueError(f"Invalid webhook URL: {url}")
+
+        now = time.time()
+        with self.wake:
+            with self.db:
+                cursor = self.db.execute(
+                    "INSERT INTO outbox (url, host, payload, status, next_attempt, created) "
+                    "VALUES (?, ?, ?, 'pending', ?, ?)",
+                    (url, host, json.dumps(payload, default=str), now, now)
+                )
+            self.metrics['enqueued'] += 1
+            self.wake.notify()
+            return cursor.lastrowid
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"webhook-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=5):
+        with self.wake:
+            self.running = False
+            self.wake.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def _claim(self):
+        """Mark the next due delivery to a host with spare capacity as sending
+
+        Returns (row, 0) or (None, seconds until something may be due).
+        Saturated hosts are left out of the query, so a backlog for one
+        host cannot hide due rows for the others.
+        """
+        now = time.time()
+        if now - self.pruned_at > 60:
+            self._prune(now)
+
+        saturated = [host for host, running in self.in_flight.items() if running >= self.per_host]
+        row = self.db.execute(
+            "SELECT id, url, host, payload, attempts, next_attempt FROM outbox "
+            f"WHERE status = 'pending' AND host NOT IN ({','.join('?' * len(saturated))}) "
+            "ORDER BY next_attempt LIMIT 1",
+            saturated
+        ).fetchone()
+        if row is None:
+            return None, None
+        if row[5] > now:
+            return None, row[5] - now
+        with self.db:
+            self.db.execute("UPDATE outbox SET status = 'sending' WHERE id = ?", (row[0],))
+        self.in_flight[row[2]] += 1
+        return row, 0
+
+    def _prune(self, now):
+        """Delete delivered rows older than retention; call with self.lock held"""
+        with self.db:
+            self.db.execute("DELETE FROM outbox WHERE status = 'delivered' AND created < ?",
+                            (now - self.retention,))
+        self.pruned_at = now
+
+    def _work(self):
+        while True:
+            with self.wake:
+                while True:
+                    if not self.running:
+                        return
+                    row, delay = self._claim()
+                    if row is not None:
+                        break
+                    self.wake.wait(delay if delay is not None else 1.0)
+            self._deliver(*row[:5])
+
+    def _session(self, host):
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[host] = session
+            return session
+
+    def _deliver(self, delivery_id, url, host, payload, attempts):
+        headers = {
+            'Content-Type': 'application/json',
+            'X-QRC-Delivery': str(delivery_id),
+            'X-QRC-Attempt': str(attempts + 1)
+        }
+        if self.secret:
+            headers['X-QRC-Signature'] = hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+
+        started = time.time()
+        error = None
+        try:
+            response = self._session(host).post(url, data=payload, headers=headers, timeout=self.timeout)
+            if not 200 <= response.status_code < 300:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e) or e.__class__.__name__
+        elapsed = time.time() - started
+
+        with self.wake:
+            self.in_flight[host] -= 1
+            host_metrics = self.metrics['by_host'][host]
+            with self.db:
+                if error is None:
+                    self.db.execute("UPDATE outbox SET status = 'delivered', attempts = ? WHERE id = ?",
+                                    (attempts + 1, delivery_id))
+                    self.metrics['delivered'] += 1
+                    self.metrics['latency_total'] += elapsed
+                    host_metrics['delivered'] += 1
+                elif attempts + 1 >= self.max_attempts:
+                    self.db.execute(
+                        "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                        (attempts + 1, error, delivery_id))
+                    self.metrics['failed'] += 1
+                    host_metrics['errors'] += 1
+                else:
+                    # Exponential backoff with jitter so retries to one host spread out
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempts) * random.uniform(0.5, 1.0)
+                    self.db.execute(
+                        "UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, "
+                        "next_attempt = ? WHERE id = ?",
+                        (attempts + 1, error, time.time() + delay, delivery_id))
+                    self.metrics['retried'] += 1
+                    host_metrics['errors'] += 1
+            self.wake.notify()
+
+    def status(self, delivery_id):
+        """Delivery state, or None if unknown or pruned after delivery"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT status, attempts, last_error FROM outbox WHERE id = ?", (delivery_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'id': delivery_id, 'status': row[0], 'attempts': row[1], 'last_error': row[2]}
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            delivered = self.metrics['delivered']
+            return {
+                'queued': counts.get('pending', 0),
+                'sending': counts.get('sending', 0),
+                'delivered': delivered,
+                'failed': self.metrics['failed'],
+                'retried': self.metrics['retried'],
+                'enqueued': self.metrics['enqueued'],
+                'average_latency_ms': round(self.metrics['latency_total'] / delivered * 1000, 2) if delivered else 0,
+                'hosts': {host: dict(m) for host, m in self.metrics['by_host'].items()}
+            }
+
@@ -0,0 +1,51 @@
+# witnesses.py
+import hashlib
+import json
+
+# Fields moved out of a signed transaction into its block's witness section
+WITNESS_FIELDS = ('signature', 'public_key')
+
+
+def is_signed(transaction):
+    """True for transactions carrying a client Dilithium signature"""
+    return 'signature_algorithm' in transaction
+
+
+def transaction_id(transaction):
+    """Hash of a signed transaction's non-witness data
+
+    The id does not change when the witness is stripped or pruned.
+    """
+    data = {k: v for k, v in transaction.items() if k not in WITNESS_FIELDS and k != 'txid'}
+    return hashlib.sha3_256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def split_witnesses(transactions):
+    """(transactions without witness fields, {txid: witness})"""
+    stripped = []
+    witnesses = {}
+    for transaction in transactions:
+        witness = {k: transaction[k] for k in WITNESS_FIELDS if k in transaction}
+        if not is_signed(transaction) or 'txid' not in transaction or not witness:
+            stripped.append(transaction)
+            continue
+        stripped.append({k: v for k, v in transaction.items() if k not in WITNESS_FIELDS})
+        witnesses[transaction['txid']] = witness
+    return stripped, witnesses
+
+
+def witness_commitment(witnesses):
+    """Hash committing to every witness in a block, or None without any"""
+    if not witnesses:
+        return None
+    digest = hashlib.sha3_256()
+    for txid in sorted(witnesses):
+        digest.update(txid.encode())
+        digest.update(hashlib.sha3_256(json.dumps(witnesses[txid], sort_keys=True).encode()).digest())
+    return digest.hexdigest()
+
+
+def attach_witness(transaction, witnesses):
+    """The transaction with its witness fields restored, if available"""
+    witness = witnesses.get(transaction.get('txid')) if witnesses else None
+    return {**transaction, **witness} if witness else transaction